@@ -1,47 +1,35 @@
 <<<<<<< HEAD
 import os
-import requests
-from bs4 import BeautifulSoup
 import streamlit as st
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
+from langchain_ollama import OllamaLLM
 import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chroma_store import CHROMA_PATH, add_new_documents, get_or_create_collection, list_sources
+from embeddings import collection_for_backend, make_embedding_function
+from corpus import chroma_where, new_session_id, parse_articles
+from ingest_ui import get_ingest_queue, show_ingest_jobs, submit_sources
+from fetcher import get_fetcher
 import fitz
 from io import BytesIO
 import tempfile
 
 # Constants
 LLM_MODEL = "llama3.2"
-BASE_URL = "http://localhost:11434"
-
-chroma_client = chromadb.PersistentClient(path=os.path.join(os.getcwd(), "chroma_db"))
-
-class ChromaDBEmbeddingFunction:
-    def __init__(self, langchain_embeddings):
-        self.langchain_embeddings = langchain_embeddings
+BASE_URL = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 
-    def __call__(self, input):
-        if isinstance(input, str):
-            input = [input]
-        elif not isinstance(input, list):
-            raise ValueError("Input to the embedding function must be a string or a list of strings.")
-        return self.langchain_embeddings.embed_documents(input)
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 
-embedding = ChromaDBEmbeddingFunction(
-    langchain_embeddings=OllamaEmbeddings(model=LLM_MODEL, base_url=BASE_URL)
-)
+embedding = make_embedding_function()
 
-collection_name = "rag_collection_demo"
-collection = chroma_client.get_or_create_collection(
-    name=collection_name,
-    metadata={"description": "RAG collection for documents"},
-    embedding_function=embedding
-)
+collection_name = collection_for_backend()
+collection = get_or_create_collection(chroma_client, collection_name, embedding)
 
-def add_documents_to_collection(documents, ids):
+def add_documents_to_collection(documents, ids, metadatas=None):
     if not documents or not ids:
         raise ValueError("Documents or IDs are empty, cannot add to collection")
-    collection.add(documents=documents, ids=ids)
+    return add_new_documents(collection, documents, ids, metadatas)
+
+def delete_documents_from_collection(ids):
+    collection.delete(ids=ids)
 
 def read_pdf(file):
     with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
@@ -59,42 +47,28 @@ def read_pdf(file):
     return text
 
 def read_html(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    content = soup.find("div", class_="content")
-    return content.get_text() if content else ""
-
-def process_and_add_documents(content, file_name_prefix=""):
-    if not content:
-        print(f"Warning: Content from {file_name_prefix} is empty. Skipping processing.")
-        return
-
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = text_splitter.split_text(content)
-
-    if not chunks:
-        print(f"No chunks found in the content of {file_name_prefix}")
-    else:
-        print(f"Splitting content into {len(chunks)} chunks for {file_name_prefix}.")
-
-    chunk_ids = [f"{file_name_prefix}_chunk_{i}" for i in range(len(chunks))]
-
-    if not chunks or not chunk_ids:
-        print(f"Warning: No valid chunks or chunk IDs for {file_name_prefix}. Skipping add to collection.")
-        return
-
-    add_documents_to_collection(chunks, chunk_ids)
-
-def rag_pipeline(query_text):
-    retrieved_docs = query_chromadb(query_text)
+    # Pooled, cached fetch with timeouts and retries; only the content div is parsed (see fetcher.py).
+    return get_fetcher().fetch_text(url, "div", {"class": "content"})
+
+def read_source(kind, data):
+    """Runs on an ingestion worker thread: data is the file bytes, or the URL for kind "html"."""
+    if kind == "pdf":
+        return read_pdf(BytesIO(data))
+    if kind == "html":
+        return read_html(data.decode("utf-8"))
+    return data.decode("utf-8")
+
+def rag_pipeline(query_text, filters=None):
+    retrieved_docs = query_chromadb(query_text, where=chroma_where(filters))
     context = " ".join(doc for docs in retrieved_docs for doc in docs) if retrieved_docs else ""
     prompt = f"{context} {query_text}" if context else query_text
     return query_ollama(prompt)
 
-def query_chromadb(query_text, n_results=3):
+def query_chromadb(query_text, n_results=3, where=None):
     results = collection.query(
         query_texts=[query_text],
-        n_results=n_results
+        n_results=n_results,
+        where=where
     )
     return results["documents"]
 
@@ -104,6 +78,13 @@ def query_ollama(prompt):
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "upload_session" not in st.session_state:
+    st.session_state.upload_session = new_session_id()
+if "sources" not in st.session_state:
+    st.session_state.sources = list_sources(collection)
+
+def refresh_sources():
+    st.session_state.sources = list_sources(collection)
 
 def main():
     st.title("Interactive AI Assistant for the Constitution of Kazakhstan")
@@ -114,24 +95,23 @@ def main():
     uploaded_files = st.sidebar.file_uploader(
         "Upload .txt or .pdf files", type=["txt", "pdf"], accept_multiple_files=True
     )
-    url = st.sidebar.text_input("Enter URL to HTML version of Constitution")
+    corpus = st.sidebar.text_input("Corpus (optional namespace)").strip()
+    urls = st.sidebar.text_input("Enter URL(s) to HTML version of Constitution, separated by spaces").split()
 
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            file_extension = uploaded_file.name.split(".")[-1].lower()
-
-            if file_extension == "txt":
-                content = uploaded_file.read().decode("utf-8")
-            elif file_extension == "pdf":
-                content = read_pdf(uploaded_file)
+    ingest_queue = get_ingest_queue(read_source, add_documents_to_collection, delete_documents_from_collection)
 
-            process_and_add_documents(content, file_name_prefix=uploaded_file.name)
+    # Queue uploaded files and URLs for background ingestion
+    submit_sources(ingest_queue, uploaded_files or [], urls, st.session_state.upload_session, corpus)
+    if uploaded_files:
+        st.sidebar.success(f"Queued {len(uploaded_files)} file(s) for ingestion.")
 
-        st.sidebar.success(f"Uploaded and processed {len(uploaded_files)} file(s).")
+    with st.sidebar:
+        show_ingest_jobs(ingest_queue, refresh_sources)
 
-    if url:
-        content = read_html(url)
-        process_and_add_documents(content, file_name_prefix="html_version")
+    st.sidebar.header("Search Scope")
+    selected_sources = st.sidebar.multiselect("Search only these sources", st.session_state.sources)
+    articles = st.sidebar.text_input("Restrict to Articles (e.g. 1, 12, 3-1)")
+    filters = {"corpus": corpus, "source": selected_sources, "article": parse_articles(articles)}
 
     prompt = st.chat_input("Ask your question:")
 
@@ -146,7 +126,7 @@ def main():
         if st.session_state.messages[-1]["role"] != "assistant":
             with st.chat_message("assistant"):
                 with st.spinner("Assistant is typing..."):
-                    response_message = rag_pipeline(prompt)
+                    response_message = rag_pipeline(prompt, filters)
                     st.session_state.messages.append({"role": "assistant", "content": response_message})
                     st.write(response_message)
 
@@ -155,169 +135,16 @@ if __name__ == "__main__":
 =======
 import streamlit as st
 import logging
-from langchain_ollama import OllamaLLM
-from sentence_transformers import SentenceTransformer
-from pymongo import MongoClient
-import numpy as np
 import chardet
-import requests
-from bs4 import BeautifulSoup
+from collections import OrderedDict
+from corpus import mongo_filter, new_session_id, parse_articles
+from mongo_rag import (
+    add_document_to_mongodb, collection, final_rag_fusion_answer, get_constitution_text,
+    next_document_id, query_with_ollama, retrieve_and_answer, summarize_context, summary_key
+)
 
 logging.basicConfig(level=logging.INFO)
 
-# Подключение к базе данных MongoDB
-mongo_client = MongoClient("mongodb://localhost:27017/")
-mongo_db = mongo_client["rag_db"]
-collection = mongo_db["documents"]
-
-class EmbeddingFunction:
-    def __init__(self, model_name):
-        self.model = SentenceTransformer(model_name)
-
-    def call(self, input):
-        if isinstance(input, str):
-            input = [input]
-        vectors = self.model.encode(input)
-        if len(vectors) == 0:
-            raise ValueError("Empty embedding generated.")
-        return vectors
-
-
-embedding = EmbeddingFunction("paraphrase-multilingual-MiniLM-L12-v2")
-
-
-def add_document_to_mongodb(documents, ids):
-    try:
-        for doc, doc_id in zip(documents, ids):
-            if not doc.strip():
-                raise ValueError("Cannot add an empty or whitespace-only document.")
-
-            embedding_vector = embedding.call(doc)
-
-            logging.info(f"Generated embedding for document '{doc}': {embedding_vector}")
-
-            collection.insert_one({
-                "_id": doc_id,
-                "document": doc,
-                "embedding": embedding_vector[0].tolist()
-            })
-    except Exception as e:
-        logging.error(f"Error adding document: {e}")
-        raise
-
-def query_documents_from_mongodb(query_text, n_results=1):
-    try:
-        query_embedding = embedding(query_text)[0]
-        docs = collection.find()
-
-        similarities = []
-        for doc in docs:
-            doc_embedding = np.array(doc["embedding"])
-            similarity = np.dot(query_embedding, doc_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(doc_embedding)
-            )
-            similarities.append((similarity, doc))
-
-        top_results = sorted(similarities, key=lambda x: x[0], reverse=True)[:n_results]
-        return [doc["document"] for _, doc in top_results]
-    except Exception as e:
-        logging.error(f"Error querying documents: {e}")
-        return []
-
-def query_with_ollama(prompt, model_name):
-    try:
-        logging.info(f"Sending prompt to Ollama with model {model_name}: {prompt}")
-        llm = OllamaLLM(model=model_name)
-        response = llm.invoke(prompt)
-        logging.info(f"Ollama response: {response}")
-        return response
-    except Exception as e:
-        logging.error(f"Error with Ollama query: {e}")
-        return f"Error with Ollama API: {e}"
-
-def retrieve_and_answer(query_text, model_name):
-    retrieved_docs = query_documents_from_mongodb(query_text)
-    context = " ".join(retrieved_docs) if retrieved_docs else "No relevant documents found."
-
-    augmented_prompt = f"Context: {context}\n\nQuestion: {query_text}\nAnswer:"
-    return query_with_ollama(augmented_prompt, model_name)
-
-# Функция для извлечения текста с сайта Конституции Республики Казахстан
-def get_constitution_text():
-    url = "https://www.akorda.kz/en/constitution-of-the-republic-of-kazakhstan-50912"
-    response = requests.get(url)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        constitution_text = ""
-        for paragraph in soup.find_all("p"):
-            constitution_text += paragraph.get_text() + "\n"
-        logging.info(f"Extracted Constitution text: {constitution_text[:500]}...")  # Покажем первые 500 символов
-        return constitution_text       
-    else:
-        logging.error("Error fetching the Constitution text from the website.")
-        return "Error fetching the Constitution text from the website."
-
-# === Multiquery and RAG Fusion Functions ===
-def generate_alternative_queries(question, model, num_queries=5):
-    """
-    Generate alternative queries from the original question using Ollama.
-    """
-    prompt = (
-        f"You are an AI language model assistant. Your task is to generate {num_queries} different "
-        f"versions of the given user question to retrieve relevant documents from a vector database. "
-        f"By generating multiple perspectives on the user question, your goal is to help the user overcome "
-        f"some of the limitations of the distance-based similarity search. Provide these alternative questions "
-        f"separated by newlines.\nOriginal question: {question}"
-    )
-    response = query_with_ollama(prompt, model)
-    alternative_queries = [q.strip() for q in response.split("\n") if q.strip()]
-    return alternative_queries
-
-def reciprocal_rank_fusion(results, k=60):
-    """
-    Perform Reciprocal Rank Fusion (RRF) on lists of retrieved documents.
-    Each element in 'results' is a list of documents (strings) retrieved for an alternative query.
-    """
-    fused_scores = {}
-    for docs in results:
-        for rank, doc in enumerate(docs):
-            if doc not in fused_scores:
-                fused_scores[doc] = 0
-            fused_scores[doc] += 1 / (rank + k)
-    # Sort documents by fused score in descending order
-    fused_results = sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
-    return fused_results
-
-def multiquery_rag_fusion(query, model, num_alternatives=5, n_results=3, k=60):
-    """
-    Generate alternative queries, retrieve documents for each, and apply RRF to fuse results.
-    Returns a list of tuples (document, fused_score).
-    """
-    alternative_queries = generate_alternative_queries(query, model, num_alternatives)
-    logging.info(f"Alternative queries: {alternative_queries}")
-    all_results = []
-    for alt_query in alternative_queries:
-        docs = query_documents_from_mongodb(alt_query, n_results)
-        all_results.append(docs)
-    logging.info(f"Retrieved documents for alternative queries: {all_results}")
-    fused_results = reciprocal_rank_fusion(all_results, k)
-    return fused_results
-
-def final_rag_fusion_answer(query, model, num_alternatives=5, n_results=3, k=60):
-    """
-    Get final answer using RAG Fusion: fuse retrieved documents and generate an answer with context.
-    """
-    fused_results = multiquery_rag_fusion(query, model, num_alternatives, n_results, k)
-    if fused_results:
-        # Use top 3 fused documents as context (adjust as needed)
-        top_docs = [doc for doc, score in fused_results[:3]]
-        context = " ".join(top_docs)
-    else:
-        context = "No relevant documents found."
-    augmented_prompt = f"Context: {context}\n\nQuestion: {query}\nAnswer:"
-    answer = query_with_ollama(augmented_prompt, model)
-    return answer
-
 # === Streamlit UI ===
 
 st.title("Chat with Ollama")
@@ -336,12 +163,44 @@ menu_options = [
 ]
 menu = st.sidebar.selectbox("Choose an action", menu_options)
 
+if "upload_session" not in st.session_state:
+    st.session_state.upload_session = new_session_id()
+corpus = st.sidebar.text_input("Corpus (optional namespace)").strip()
+
+
+def search_scope_filters():
+    """Sidebar widgets restricting retrieval to selected sources / Articles."""
+    st.sidebar.header("Search Scope")
+    sources = collection.distinct("metadata.source", mongo_filter({"corpus": corpus}))
+    selected_sources = st.sidebar.multiselect("Search only these sources", sorted(sources))
+    articles = st.sidebar.text_input("Restrict to Articles (e.g. 1, 12, 3-1)")
+    return {"corpus": corpus, "source": selected_sources, "article": parse_articles(articles)}
+
+
+@st.fragment(run_every=2)
+def wait_for_summary(summary):
+    """Polls while the background summary runs, then reruns the app once to show it."""
+    if summary.done():
+        st.rerun()
+    st.info("Generating the summary...")
+
+
+def show_summary(summary):
+    if summary.done():
+        st.write(summary.result())
+    else:
+        wait_for_summary(summary)
+
+
 if menu == "Show Documents in MongoDB":
     st.subheader("Stored Documents in MongoDB")
-    documents = collection.find()
+    # Documents are stored as chunks; show each parent document once.
+    documents = OrderedDict()
+    for doc in collection.find({}, {"parent_id": 1, "document": 1}):
+        documents.setdefault(doc.get("parent_id", doc["_id"]), []).append(doc["document"])
     if documents:
-        for i, doc in enumerate(documents, start=1):
-            st.write(f"{i}. {doc['document']}")
+        for i, (doc_id, chunks) in enumerate(documents.items(), start=1):
+            st.write(f"{i}. {doc_id}: " + "\n".join(chunks))
     else:
         st.write("No data available!")
 
@@ -359,17 +218,22 @@ if st.button("Add Document"):
                     raise ValueError("Failed to detect file encoding.")
                 file_content = file_bytes.decode(detected_encoding)
 
-                doc_id = f"doc{collection.count_documents({}) + 1}"
+                doc_id = next_document_id()
                 st.write(f"Adding document from file: {uploaded_file.name}")
-                add_document_to_mongodb([file_content], [doc_id])
+                add_document_to_mongodb(
+                    [file_content], [doc_id], [uploaded_file.name],
+                    session=st.session_state.upload_session, corpus=corpus
+                )
                 st.success(f"Document added successfully with ID {doc_id}")
             except Exception as e:
                 st.error(f"Failed to add document: {e}")
         elif new_doc.strip(): 
             try:
-                doc_id = f"doc{collection.count_documents({}) + 1}"
+                doc_id = next_document_id()
                 st.write(f"Adding document: {new_doc}")
-                add_document_to_mongodb([new_doc], [doc_id])
+                add_document_to_mongodb(
+                    [new_doc], [doc_id], session=st.session_state.upload_session, corpus=corpus
+                )
                 st.success(f"Document added successfully with ID {doc_id}")
             except Exception as e:
                 st.error(f"Failed to add document: {e}")
@@ -400,9 +264,10 @@ elif menu == "Upload File and Ask Question":
             st.error(f"Failed to process the file: {e}")
 
 elif menu == "Ask Ollama a Question":
+    filters = search_scope_filters()
     query = st.text_input("Ask a question")
     if query:
-        response = retrieve_and_answer(query, model)
+        response = retrieve_and_answer(query, model, filters)
         st.write("Response:", response)
 
 elif menu == "Ask Question About Constitution":
@@ -416,19 +281,25 @@ elif menu == "Ask Question About Constitution":
                 context = constitution_text[:2000]  # Ограничение на первые 2000 символов
                 logging.info(f"Constitution text: {context[:500]}...")  # Отладочный вывод
 
-                # Формируем запрос к Ollama
-                augmented_prompt = f"Context: {context}\n\nQuestion: {question}\nAnswer:"
-                response = query_with_ollama(augmented_prompt, model)
+                # Краткий текст зависит только от контекста: он генерируется в фоне
+                # параллельно с ответом и кэшируется по хэшу контекста
+                summary = summarize_context(context, model)
+
+                # Формируем запрос к Ollama; ответ хранится в сессии, чтобы повторный
+                # запуск скрипта (например, когда готов краткий текст) не генерировал его заново
+                answer_key = (question, summary_key(context, model))
+                if st.session_state.get("constitution_answer", (None, None))[0] != answer_key:
+                    augmented_prompt = f"Context: {context}\n\nQuestion: {question}\nAnswer:"
+                    st.session_state.constitution_answer = (answer_key, query_with_ollama(augmented_prompt, model))
+                response = st.session_state.constitution_answer[1]
 
                 # Выводим ответ от Ollama и краткий текст Конституции
                 st.write("Constitution Text (Extract):")
                 st.text_area("Constitution Text", context, height=200)
                 st.write("Response from Ollama:", response)
 
-                # Генерация краткого текста
-                summary_prompt = f"Summarize the following content: {context}"
-                summary = query_with_ollama(summary_prompt, model)
-                st.write("Summary of the Constitution Text:", summary)
+                with st.expander("Summary of the Constitution Text"):
+                    show_summary(summary)
             else:
                 st.write("Failed to fetch Constitution text.")
         except Exception as e:
@@ -437,6 +308,7 @@ elif menu == "Ask Question About Constitution":
             
 elif menu == "Ask Multiquery & RAG Fusion Question":
     st.subheader("Ask a question using Multiquery and RAG Fusion")
+    filters = search_scope_filters()
     query = st.text_input("Enter your question:")
     if query:
         # The final_rag_fusion_answer function will:
@@ -444,7 +316,7 @@ elif menu == "Ask Multiquery & RAG Fusion Question":
         # 2. Retrieve documents for each alternative query.
         # 3. Fuse the results via reciprocal rank fusion.
         # 4. Build an augmented prompt for the final answer.
-        response = final_rag_fusion_answer(query, model)
+        response = final_rag_fusion_answer(query, model, filters=filters)
         st.write("Response:", response)
         
         
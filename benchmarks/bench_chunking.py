@@ -0,0 +1,75 @@
+"""
+Compare the structure-aware chunker with the fixed-size splitter on the test corpora.
+
+Run from the repository root:
+    python -m benchmarks.bench_chunking
+"""
+import os
+import time
+
+import fitz
+
+from chunking import ARTICLE_RE, CHUNK_OVERLAP, CHUNK_SIZE, iter_chunks, iter_lines
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test")
+TXT_PATH = os.path.join(TEST_DIR, "Constitution of Kazakhstan.txt")
+PDF_PATH = os.path.join(TEST_DIR, "kaz127827E.pdf")
+REPEAT = 20
+
+
+def load_corpora():
+    with open(TXT_PATH, encoding="utf-8") as f:
+        txt = f.read()
+    doc = fitz.open(PDF_PATH)
+    try:
+        pdf_pages = [page.get_text() for page in doc]
+    finally:
+        doc.close()
+    return {"constitution.txt": [txt], "kaz127827E.pdf": pdf_pages}
+
+
+def count_articles(pages):
+    return sum(1 for line in iter_lines(pages) if ARTICLE_RE.match(line))
+
+
+def count_mixed(chunks):
+    """Count chunks that contain the headings of more than one Article."""
+    return sum(
+        1 for chunk in chunks
+        if len({line.strip() for line in chunk.splitlines() if ARTICLE_RE.match(line.strip())}) > 1
+    )
+
+
+def measure(name, split, pages):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        chunks = split(pages)
+    elapsed = (time.perf_counter() - started) / REPEAT
+    sizes = [len(c) for c in chunks]
+    print(
+        f"  {name:<12} chunks={len(chunks):4d}  embedded_chars={sum(sizes):7d}  "
+        f"avg={sum(sizes) / len(sizes):6.1f}  max={max(sizes):4d}  "
+        f"mixed_articles={count_mixed(chunks):3d}  time={elapsed * 1000:7.2f} ms"
+    )
+
+
+def main():
+    splitters = {
+        "structured": lambda pages: [c.text for c in iter_chunks(pages, CHUNK_SIZE, CHUNK_OVERLAP)],
+    }
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        recursive = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        splitters["recursive"] = lambda pages: recursive.split_text("".join(pages))
+    except ImportError:
+        print("langchain-text-splitters is not installed, skipping RecursiveCharacterTextSplitter baseline")
+
+    for corpus, pages in load_corpora().items():
+        print(f"{corpus}: {sum(len(p) for p in pages)} chars, {count_articles(pages)} articles")
+        for name, split in splitters.items():
+            measure(name, split, pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Exercise fetcher.py against a local HTTP server and compare it with the old
+``requests.get`` + full ``html.parser`` parse.
+
+The server serves --pages copies of the Constitution as HTML (content div plus
+page chrome) with ETag and Last-Modified headers and --latency seconds of delay
+per reply. It also has a /slow page that never answers in time and a /flaky page
+that fails with 503 once. Pages are spread over two host names (127.0.0.1 and
+localhost), so the per-host limit applies to each.
+
+Run from the repository root:
+    python -m benchmarks.bench_fetcher --pages 16 --latency 0.2
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+
+from fetcher import HTML_PARSER, Fetcher, extract_text
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test",
+                        "Constitution of Kazakhstan.txt")
+CHROME = "<nav>" + "".join(f"<a href='/p{i}'>Link {i}</a>" for i in range(300)) + "</nav>"
+
+
+def build_page(text):
+    paragraphs = "".join(f"<p>{escape(line)}</p>" for line in text.splitlines() if line.strip())
+    return (f"<html><head><title>Constitution</title></head><body>{CHROME}"
+            f"<div class='content'>{paragraphs}</div>{CHROME}</body></html>").encode("utf-8")
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    page = b""
+    latency = 0.0
+    modified = formatdate(usegmt=True)
+    lock = threading.Lock()
+    counts = {"200": 0, "304": 0, "503": 0}
+    flaky_failed = set()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, status):
+        with self.lock:
+            self.counts[status] += 1
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(60)
+        time.sleep(self.latency)
+        if self.path == "/flaky" and self.headers["Host"] not in self.flaky_failed:
+            self.flaky_failed.add(self.headers["Host"])
+            self._count("503")
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = '"%s"' % hashlib.sha1(self.page + self.path.encode("utf-8")).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self._count("304")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self._count("200")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.page)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.modified)
+        self.end_headers()
+        self.wfile.write(self.page)
+
+
+def start_server(page, latency):
+    handler = type("ConfiguredPageHandler", (PageHandler,), {
+        "page": page, "latency": latency, "counts": {"200": 0, "304": 0, "503": 0}, "flaky_failed": set(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler
+
+
+def old_read_html(url):
+    response = requests.get(url)
+    soup = BeautifulSoup(response.text, "html.parser")
+    content = soup.find("div", class_="content")
+    return content.get_text() if content else ""
+
+
+def timed(label, function, handler):
+    handler.counts.update({"200": 0, "304": 0, "503": 0})
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    counts = handler.counts
+    print(f"  {label:<34} {elapsed:7.2f} s   200={counts['200']:3d} 304={counts['304']:3d} 503={counts['503']:2d}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP fetch layer benchmark against a local server")
+    parser.add_argument("--pages", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="server delay per reply, seconds")
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--parse-repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(TXT_PATH, encoding="utf-8") as f:
+        page = build_page(f.read())
+    server, handler = start_server(page, args.latency)
+    port = server.server_address[1]
+    urls = [f"http://{host}:{port}/page{i}" for i in range(args.pages) for host in ("127.0.0.1", "localhost")]
+    urls = urls[:args.pages]
+    print(f"{len(urls)} pages of {len(page) / 1024:.0f} KiB, {args.latency}s server latency, "
+          f"parser={HTML_PARSER}, per-host limit={args.per_host}")
+
+    fetcher = Fetcher(cache_path=tempfile.mkdtemp(prefix="fetch-cache-"), per_host_limit=args.per_host)
+    baseline = timed("requests.get, sequential", lambda: [old_read_html(url) for url in urls], handler)
+    cold = timed("fetch_many, cold cache", lambda: fetcher.fetch_many(urls, "div", {"class": "content"}), handler)
+    warm = timed("fetch_many, unchanged (304)", lambda: fetcher.fetch_many(urls, "div", {"class": "content"}), handler)
+    same = all(baseline[i] == cold[url] == warm[url] for i, url in enumerate(urls))
+    print(f"  extracted text identical to the old read_html: {same}")
+
+    flaky = timed("fetch, 503 once then retried", lambda: fetcher.fetch_text(f"http://127.0.0.1:{port}/flaky"), handler)
+    print(f"  flaky page recovered: {bool(flaky)}")
+    short = Fetcher(cache_path=fetcher.cache_path, timeout=(2, 1), retries=0)
+    mixed = [f"http://127.0.0.1:{port}/slow"] + urls[:4]
+    results = timed("fetch_many, one page times out", lambda: short.fetch_many(mixed), handler)
+    failed = [url for url, value in results.items() if isinstance(value, Exception)]
+    print(f"  failed: {failed}, others fetched: {len(mixed) - len(failed)}")
+
+    print("parsing one page:")
+    html = page.decode("utf-8")
+    for label, parse in (
+        ("html.parser, whole document",
+         lambda: BeautifulSoup(html, "html.parser").find("div", class_="content").get_text()),
+        (f"{HTML_PARSER}, content div only", lambda: extract_text(html, "div", {"class": "content"})),
+    ):
+        started = time.perf_counter()
+        for _ in range(args.parse_repeat):
+            parse()
+        print(f"  {label:<34} {(time.perf_counter() - started) / args.parse_repeat * 1000:7.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare PyTorch float32 embeddings with ONNX Runtime float32 and int8 on the
+Constitution chunks: agreement with the float32 vectors, top-k retrieval
+overlap for a set of questions, bulk throughput and single-query latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_onnx_embeddings
+    python -m benchmarks.bench_onnx_embeddings --threads 1 2 4 --model paraphrase-multilingual-MiniLM-L12-v2
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.load_test import DEFAULT_QUESTIONS
+from chunking import iter_chunks
+from onnx_embeddings import ONNX_CACHE_PATH, OnnxSentenceEncoder, load_encoder
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test",
+                        "Constitution of Kazakhstan.txt")
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+
+def top_k(queries, chunks, k):
+    return np.argsort(-(queries @ chunks.T), axis=1)[:, :k]
+
+
+def measure(encoder, texts, questions, batch_size, repeat):
+    encoder.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        chunks = encoder.encode(texts, batch_size=batch_size)
+    throughput = len(texts) * repeat / (time.perf_counter() - started)
+
+    latencies = []
+    for question in questions * repeat:
+        started = time.perf_counter()
+        encoder.encode([question])
+        latencies.append(time.perf_counter() - started)
+    return normalize(chunks), normalize(encoder.encode(questions)), throughput, float(np.median(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyTorch vs ONNX Runtime (int8) embedding benchmark")
+    parser.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--threads", type=int, nargs="+", default=[0], help="intra-op threads, 0 = default")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cache-path", default=ONNX_CACHE_PATH)
+    args = parser.parse_args()
+
+    with open(TXT_PATH, encoding="utf-8") as f:
+        texts = [chunk.text for chunk in iter_chunks(f.read())]
+    questions = [question for _, question in DEFAULT_QUESTIONS]
+    print(f"{args.model}: {len(texts)} chunks, {len(questions)} questions, batch size {args.batch_size}")
+
+    reference = None
+    print(f"  {'inference':<10} {'threads':>7} {'chunks/s':>9} {'query ms':>9} "
+          f"{'cos mean':>9} {'cos min':>9} {f'top-{args.top_k} overlap':>14}")
+    for threads in args.threads:
+        if threads:
+            torch.set_num_threads(threads)
+        encoders = {
+            "torch": lambda: load_encoder(args.model, "torch"),
+            "onnx": lambda: OnnxSentenceEncoder(args.model, False, threads, args.cache_path),
+            "onnx-int8": lambda: OnnxSentenceEncoder(args.model, True, threads, args.cache_path),
+        }
+        for name, build in encoders.items():
+            chunks, queries, throughput, latency = measure(
+                build(), texts, questions, args.batch_size, args.repeat
+            )
+            if reference is None:  # the first PyTorch run is the float32 reference
+                reference = chunks, top_k(queries, chunks, args.top_k)
+            cosine = (chunks * reference[0]).sum(axis=1)
+            hits = top_k(queries, chunks, args.top_k)
+            overlap = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(hits, reference[1])])
+            print(f"  {name:<10} {threads or 'auto':>7} {throughput:>9.1f} {latency * 1000:>9.2f} "
+                  f"{cosine.mean():>9.5f} {cosine.min():>9.5f} {overlap:>14.2%}")
+
+
+if __name__ == "__main__":
+    main()
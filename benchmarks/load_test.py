@@ -0,0 +1,198 @@
+"""
+Concurrent-session load test for the answer pipelines.
+
+Drives rag_pipeline (main.py, ChromaDB) and retrieve_and_answer /
+final_rag_fusion_answer (mongo_rag.py, MongoDB) directly with N simulated
+users. The LLM is served by benchmarks/stub_ollama.py (or a real Ollama via
+--ollama-url). For every pipeline and concurrency level the harness reports
+throughput, end-to-end latency percentiles and how long LLM calls waited for
+a free generation slot.
+
+Run from the repository root:
+    python -m benchmarks.load_test --concurrency 1 2 4 8 --requests-per-user 5
+    python -m benchmarks.load_test --pipelines rag_pipeline --parallel 2 --token-rate 20
+
+ChromaDB data goes into a fresh temporary working directory (--workdir), and
+MongoDB data into the "rag_db_loadtest" database unless MONGO_DB is set.
+Each store is seeded with the Constitution when it is empty.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.request
+
+from benchmarks.stub_ollama import add_stub_arguments, start_server, stub_config
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_FILE = os.path.join(REPO_ROOT, "test", "Constitution of Kazakhstan.txt")
+PIPELINES = ("rag_pipeline", "retrieve_and_answer", "final_rag_fusion_answer")
+DEFAULT_QUESTIONS = [
+    (3, "What are the rights of citizens in Kazakhstan?"),
+    (2, "What is the official language of Kazakhstan?"),
+    (2, "How is the President of the Republic elected?"),
+    (1, "What powers does the Parliament have?"),
+    (1, "Who can amend the Constitution?"),
+    (1, "What does Article 1 say about the values of the state?"),
+]
+
+
+def load_questions(path):
+    """One question per line, optionally prefixed with "<weight><TAB>"."""
+    if not path:
+        return DEFAULT_QUESTIONS
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            weight, _, question = line.partition("\t")
+            questions.append((float(weight), question) if question else (1, line))
+    return questions
+
+
+def load_pipeline(name, model, seed_text):
+    """Import the pipeline's module, seed its store if empty, return a callable(question)."""
+    if name == "rag_pipeline":
+        import main
+
+        if main.collection.count() == 0:
+            main.process_and_add_documents(seed_text, file_name_prefix=os.path.basename(SEED_FILE))
+        return main.rag_pipeline
+
+    os.environ.setdefault("MONGO_DB", "rag_db_loadtest")
+    import mongo_rag
+
+    if mongo_rag.collection.count_documents({}) == 0:
+        mongo_rag.add_document_to_mongodb([seed_text], ["constitution"], [os.path.basename(SEED_FILE)])
+    pipeline = getattr(mongo_rag, name)
+    return lambda question: pipeline(question, model)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+def fetch_stub_stats(ollama_url, reset=False):
+    request = urllib.request.Request(
+        f"{ollama_url}/stats/reset" if reset else f"{ollama_url}/stats", method="POST" if reset else "GET"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def run_level(pipeline, questions, users, requests_per_user, think_time, seed):
+    """Run ``users`` concurrent sessions; return per-request (latency, ok) and wall time."""
+    weights = [weight for weight, _ in questions]
+    texts = [text for _, text in questions]
+    results = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(users + 1)
+
+    def session(user):
+        rng = random.Random(seed * 1000 + user)
+        start_barrier.wait()
+        for _ in range(requests_per_user):
+            question = rng.choices(texts, weights)[0]
+            started = time.perf_counter()
+            try:
+                answer = pipeline(question)
+                ok = not str(answer).startswith("Error with Ollama API")
+            except Exception:
+                traceback.print_exc()
+                ok = False
+            with lock:
+                results.append((time.perf_counter() - started, ok))
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+
+    threads = [threading.Thread(target=session, args=(user,)) for user in range(users)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests-per-user", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds between a user's requests")
+    parser.add_argument("--questions", help="question mix file: one question per line, optional '<weight>\\t' prefix")
+    parser.add_argument("--model", default="llama3.2:1b")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="working directory for the ChromaDB store (default: a new temp dir)")
+    parser.add_argument("--ollama-url", help="use this Ollama server instead of starting the stub")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--embedding-backend", help="EMBEDDING_BACKEND for the ChromaDB pipeline (see embeddings.py)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    ollama_url = args.ollama_url
+    if not ollama_url:
+        _, ollama_url = start_server(**stub_config(args))
+        print(f"Stub Ollama on {ollama_url}: latency={args.latency}s, {args.token_rate} tok/s, "
+              f"{args.tokens} tokens, parallel={args.parallel}")
+    os.environ["OLLAMA_HOST"] = ollama_url
+    if args.embedding_backend:
+        os.environ["EMBEDDING_BACKEND"] = args.embedding_backend
+
+    with open(SEED_FILE, encoding="utf-8") as f:
+        seed_text = f.read()
+    questions = load_questions(args.questions)
+    json_path = os.path.abspath(args.json) if args.json else None
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix="rag-load-"))
+
+    report = []
+    for name in args.pipelines:
+        try:
+            pipeline = load_pipeline(name, args.model, seed_text)
+        except Exception as e:
+            print(f"{name}: skipped ({type(e).__name__}: {e})")
+            continue
+
+        print(f"\n{name}")
+        print(f"  {'users':>5} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} "
+              f"{'errors':>6} {'llm wait avg':>12} {'llm wait p95':>12}")
+        for users in args.concurrency:
+            if not args.ollama_url:
+                fetch_stub_stats(ollama_url, reset=True)
+            results, wall = run_level(pipeline, questions, users, args.requests_per_user,
+                                      args.think_time, args.seed)
+            latencies = [latency for latency, _ in results]
+            errors = sum(1 for _, ok in results if not ok)
+            waits = fetch_stub_stats(ollama_url)["queue_waits"] if not args.ollama_url else []
+            row = {
+                "pipeline": name, "users": users, "requests": len(results), "errors": errors,
+                "throughput": len(results) / wall,
+                "p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99), "max": max(latencies),
+                "llm_wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "llm_wait_p95": percentile(waits, 95),
+            }
+            report.append(row)
+            print(f"  {users:>5} {row['throughput']:>7.2f} {row['p50']:>7.3f} {row['p95']:>7.3f} "
+                  f"{row['p99']:>7.3f} {row['max']:>7.3f} {errors:>6} "
+                  f"{row['llm_wait_avg']:>12.3f} {row['llm_wait_p95']:>12.3f}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
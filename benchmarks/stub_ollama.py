@@ -0,0 +1,195 @@
+"""
+Local stand-in for the Ollama HTTP API, for load tests without a GPU or model.
+
+Implements the endpoints used by langchain_ollama: /api/generate and /api/chat
+(streamed NDJSON or a single JSON reply), /api/embed and /api/embeddings
+(deterministic bag-of-words vectors, so retrieval still finds related
+chunks), plus /api/tags. Generation waits ``--latency`` seconds before the
+first token, then emits ``--tokens`` tokens at ``--token-rate`` tokens per second.
+At most ``--parallel`` generations run at once, like OLLAMA_NUM_PARALLEL; the
+rest queue. GET /stats returns how long requests waited for a slot, and
+POST /stats/reset clears it.
+
+    python -m benchmarks.stub_ollama --port 11500 --latency 0.2 --token-rate 40 --parallel 1
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORD_RE = re.compile(r"\w+")
+FILLER = ("The", "Constitution", "of", "the", "Republic", "of", "Kazakhstan", "provides", "that")
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, token_rate=40.0, tokens=64, parallel=1, embedding_dim=384):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.embedding_dim = embedding_dim
+        self.slots = threading.BoundedSemaphore(parallel)
+        self.parallel = parallel
+        self.stats_lock = threading.Lock()
+        self.queue_waits = []
+
+    def record_wait(self, seconds):
+        with self.stats_lock:
+            self.queue_waits.append(seconds)
+
+    def stats(self, reset=False):
+        with self.stats_lock:
+            waits = sorted(self.queue_waits)
+            if reset:
+                self.queue_waits = []
+        return {"requests": len(waits), "queue_waits": waits}
+
+
+def embed_text(text, dim):
+    """Hash every word into a fixed-size vector and L2-normalise it."""
+    vector = [0.0] * dim
+    for word in WORD_RE.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "stub", "model": "stub"}]})
+        elif self.path == "/stats":
+            self._send_json(self.config.stats())
+        elif self.path == "/":
+            self._send_json({"status": "Ollama is running"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if self.path == "/stats/reset":
+            self._send_json(self.config.stats(reset=True))
+            return
+        request = self._read_json()
+        if self.path in ("/api/generate", "/api/chat"):
+            self._generate(request, chat=self.path == "/api/chat")
+        elif self.path == "/api/embed":
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({
+                "model": request.get("model"),
+                "embeddings": [embed_text(text, self.config.embedding_dim) for text in inputs],
+            })
+        elif self.path == "/api/embeddings":
+            self._send_json({"embedding": embed_text(request.get("prompt", ""), self.config.embedding_dim)})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _generate(self, request, chat):
+        config = self.config
+        model = request.get("model", "stub")
+        stream = request.get("stream", True)
+        queued = time.perf_counter()
+        with config.slots:
+            started = time.perf_counter()
+            config.record_wait(started - queued)
+            time.sleep(config.latency)
+
+            def part(text, done):
+                payload = {"model": model, "created_at": now(), "done": done}
+                if chat:
+                    payload["message"] = {"role": "assistant", "content": text}
+                else:
+                    payload["response"] = text
+                if done:
+                    payload.update(done_reason="stop", eval_count=config.tokens,
+                                   total_duration=int((time.perf_counter() - queued) * 1e9))
+                return payload
+
+            tokens = [f"{FILLER[i % len(FILLER)]} " for i in range(config.tokens)]
+            if not stream:
+                time.sleep(config.tokens / config.token_rate)
+                self._send_json(part("".join(tokens), True))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                time.sleep(1 / config.token_rate)
+                self._write_chunk(part(token, False))
+            self._write_chunk(part("", True))
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload):
+        line = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+
+def start_server(host="127.0.0.1", port=0, **config):
+    """Start the stub in a background thread; returns (server, base_url)."""
+    handler = type("ConfiguredStubOllamaHandler", (StubOllamaHandler,), {"config": StubConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="generated tokens per second")
+    parser.add_argument("--tokens", type=int, default=64, help="tokens per generated answer")
+    parser.add_argument("--parallel", type=int, default=1, help="generations served at once")
+    parser.add_argument("--embedding-dim", type=int, default=384)
+
+
+def stub_config(args):
+    return {"latency": args.latency, "token_rate": args.token_rate, "tokens": args.tokens,
+            "parallel": args.parallel, "embedding_dim": args.embedding_dim}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    server, url = start_server(args.host, args.port, **stub_config(args))
+    print(f"Stub Ollama listening on {url} (export OLLAMA_HOST={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
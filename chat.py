@@ -1,42 +1,34 @@
 import os
 import streamlit as st
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
+from langchain_ollama import OllamaLLM
 import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import fitz  
+from chroma_store import CHROMA_PATH, add_new_documents, get_or_create_collection
+from embeddings import collection_for_backend, make_embedding_function
+from corpus import chroma_where
+from ingest_ui import get_ingest_queue, show_ingest_jobs, submit_sources
+import fitz
 
 # Configuration
 llm_model = "llama3.2"
-base_url = "http://localhost:11434" 
-chroma_client = chromadb.PersistentClient(path=os.path.join(os.getcwd(), "chroma_db"))
+base_url = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 
-class ChromaDBEmbeddingFunction:
-    def __init__(self, langchain_embeddings):
-        self.langchain_embeddings = langchain_embeddings
+embedding = make_embedding_function()
 
-    def __call__(self, input):
-        if isinstance(input, str):
-            input = [input]
-        return self.langchain_embeddings.embed_documents(input)
+collection_name = collection_for_backend()
+collection = get_or_create_collection(chroma_client, collection_name, embedding)
 
-embedding = ChromaDBEmbeddingFunction(
-    OllamaEmbeddings(model=llm_model, base_url=base_url)
-)
+def add_documents_to_collection(documents, ids, metadatas=None):
+    return add_new_documents(collection, documents, ids, metadatas)
 
-collection_name = "rag_collection_demo"
-collection = chroma_client.get_or_create_collection(
-    name=collection_name,
-    metadata={"description": "RAG collection for documents"},
-    embedding_function=embedding
-)
+def delete_documents_from_collection(ids):
+    collection.delete(ids=ids)
 
-def add_documents_to_collection(documents, ids):
-    collection.add(documents=documents, ids=ids)
-
-def query_chromadb(query_text, n_results=3):
+def query_chromadb(query_text, n_results=3, where=None):
     results = collection.query(
         query_texts=[query_text],
-        n_results=n_results
+        n_results=n_results,
+        where=where
     )
     return results["documents"]
 
@@ -44,8 +36,8 @@ def query_ollama(prompt):
     llm = OllamaLLM(model=llm_model, base_url=base_url)
     return llm.invoke(prompt)
 
-def rag_pipeline(query_text):
-    retrieved_docs = query_chromadb(query_text)
+def rag_pipeline(query_text, filters=None):
+    retrieved_docs = query_chromadb(query_text, where=chroma_where(filters))
     context = " ".join(doc for docs in retrieved_docs for doc in docs) if retrieved_docs else ""
 
     prompt = f"{context} {query_text}" if context else query_text
@@ -54,12 +46,18 @@ def rag_pipeline(query_text):
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
-def read_pdf(file):
-    doc = fitz.open(file)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+def read_pdf(data):
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        return "".join(page.get_text() for page in doc)
+    finally:
+        doc.close()
+
+def read_source(kind, data):
+    """Runs on an ingestion worker thread: data is the uploaded file's bytes."""
+    if kind == "pdf":
+        return read_pdf(data)
+    return data.decode("utf-8")
 
 def main():
     st.title("Interactive RAG Chatbot")
@@ -71,22 +69,14 @@ def main():
         "Upload .txt or .pdf files", type=["txt", "pdf"], accept_multiple_files=True
     )
 
+    # Chunking and embedding run on the ingestion workers, not in the script run
+    ingest_queue = get_ingest_queue(read_source, add_documents_to_collection, delete_documents_from_collection)
     if uploaded_files:
-        for uploaded_file in uploaded_files:
-            file_extension = uploaded_file.name.split(".")[-1].lower()
-
-            if file_extension == "txt":
-                content = uploaded_file.read().decode("utf-8")
-            elif file_extension == "pdf":
-                content = read_pdf(uploaded_file)
-
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-            chunks = text_splitter.split_text(content)
-
-            chunk_ids = [f"{uploaded_file.name}_chunk_{i}" for i in range(len(chunks))]
-            add_documents_to_collection(chunks, chunk_ids)
+        submit_sources(ingest_queue, uploaded_files)
+        st.sidebar.success(f"Queued {len(uploaded_files)} file(s) for ingestion.")
 
-        st.sidebar.success(f"Uploaded and processed {len(uploaded_files)} file(s).")
+    with st.sidebar:
+        show_ingest_jobs(ingest_queue)
     
     prompt = st.chat_input("Ask your question:")
 
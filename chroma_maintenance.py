@@ -0,0 +1,330 @@
+"""
+Maintenance commands for the persistent ChromaDB store.
+
+Run while the Streamlit app is stopped:
+    python chroma_maintenance.py stats
+    python chroma_maintenance.py dedupe [--collection NAME] [--dry-run]
+    python chroma_maintenance.py rebuild [--collection NAME] [--M 32 --construction-ef 200 --search-ef 100 --space cosine]
+    python chroma_maintenance.py compact [--dry-run]
+    python chroma_maintenance.py bench-recall [--collection NAME] [--search-ef 10 50 100] [-k 3]
+    python chroma_maintenance.py migrate [--source rag_collection_demo] [--backend sentence-transformers] [--target NAME]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import time
+import uuid
+
+import chromadb
+import numpy as np
+
+from chroma_store import CHROMA_PATH, collection_metadata, get_or_create_collection, hnsw_settings
+from embeddings import BACKENDS, collection_for_backend, make_embedding_function
+
+PAGE_SIZE = 1000
+SQLITE_FILE = "chroma.sqlite3"
+
+
+def read_all(collection, include=("documents", "embeddings", "metadatas")):
+    """Read every record of a collection page by page."""
+    records = {"ids": [], "documents": [], "embeddings": [], "metadatas": []}
+    offset = 0
+    while True:
+        page = collection.get(include=list(include), limit=PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        records["ids"].extend(page["ids"])
+        for key in include:
+            values = page[key]
+            records[key].extend(values if values is not None else [None] * len(page["ids"]))
+        offset += len(page["ids"])
+    return records
+
+
+def copy_records(records, collection):
+    for start in range(0, len(records["ids"]), PAGE_SIZE):
+        end = start + PAGE_SIZE
+        metadatas = records["metadatas"][start:end]
+        collection.add(
+            ids=records["ids"][start:end],
+            documents=records["documents"][start:end],
+            embeddings=records["embeddings"][start:end],
+            metadatas=metadatas if any(metadatas) else None
+        )
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def is_segment_name(name):
+    try:
+        return str(uuid.UUID(name)) == name
+    except ValueError:
+        return False
+
+
+def known_segments(path):
+    """Map segment id -> collection id from the ``segments`` table."""
+    sqlite_path = os.path.join(path, SQLITE_FILE)
+    if not os.path.exists(sqlite_path):
+        return {}
+    with sqlite3.connect(sqlite_path) as conn:
+        return dict(conn.execute("SELECT id, collection FROM segments").fetchall())
+
+
+def segment_directories(path):
+    """
+    Map segment directory name -> collection id (None if the segment is unknown).
+    Only UUID-named directories are segments; anything else in ``path`` is ignored.
+    """
+    known = known_segments(path)
+    return {
+        name: known.get(name)
+        for name in os.listdir(path)
+        if is_segment_name(name) and os.path.isdir(os.path.join(path, name))
+    }
+
+
+def collection_names(client, name):
+    if name:
+        return [name]
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+
+def stats(client, args):
+    segments = segment_directories(args.path)
+    print(f"Store: {args.path} ({directory_size(args.path) / 1024:.1f} KiB)")
+    for name in collection_names(client, args.collection):
+        collection = client.get_collection(name)
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dimension = len(sample[0]) if sample is not None and len(sample) else 0
+        disk = sum(
+            directory_size(os.path.join(args.path, segment))
+            for segment, owner in segments.items() if owner == str(collection.id)
+        )
+        hnsw = {k: v for k, v in (collection.metadata or {}).items() if k.startswith("hnsw:")}
+        print(f"- {name}: {collection.count()} records, dim={dimension}, "
+              f"index={disk / 1024:.1f} KiB, settings={hnsw or 'chroma defaults'}")
+    orphans = [segment for segment, owner in segments.items() if owner is None]
+    if orphans:
+        size = sum(directory_size(os.path.join(args.path, o)) for o in orphans)
+        print(f"{len(orphans)} orphaned segment folder(s), {size / 1024:.1f} KiB; run 'compact' to remove them.")
+
+
+def dedupe(client, args):
+    """Delete records whose document text duplicates an earlier record."""
+    for name in collection_names(client, args.collection):
+        collection = client.get_collection(name)
+        records = read_all(collection, include=("documents",))
+        seen = set()
+        duplicates = []
+        for doc_id, doc in zip(records["ids"], records["documents"]):
+            key = " ".join((doc or "").split())
+            if key in seen:
+                duplicates.append(doc_id)
+            else:
+                seen.add(key)
+        print(f"{name}: {len(duplicates)} duplicate record(s) out of {len(records['ids'])}")
+        if duplicates and not args.dry_run:
+            for start in range(0, len(duplicates), PAGE_SIZE):
+                collection.delete(ids=duplicates[start:start + PAGE_SIZE])
+
+
+def rebuild(client, args):
+    """
+    Recreate collections with the current settings, reusing the stored
+    embeddings. Records are copied into a temporary collection first, so an
+    interrupted rebuild never loses the original.
+    """
+    overrides = {"space": args.space, "M": args.M,
+                 "construction_ef": args.construction_ef, "search_ef": args.search_ef}
+    for name in collection_names(client, args.collection):
+        collection = client.get_collection(name)
+        description = (collection.metadata or {}).get("description", "RAG collection for documents")
+        records = read_all(collection)
+        temp_name = f"{name}-rebuild-{uuid.uuid4().hex[:8]}"
+        rebuilt = client.create_collection(
+            name=temp_name, metadata=collection_metadata(name, description, **overrides)
+        )
+        copy_records(records, rebuilt)
+        client.delete_collection(name)
+        rebuilt.modify(name=name)
+        print(f"{name}: rebuilt {len(records['ids'])} records with {hnsw_settings(name, **overrides)}")
+    compact(client, args)
+
+
+def compact(client, args):
+    """Remove segment folders no collection refers to and vacuum the SQLite file."""
+    # A wrong --path gets a fresh, empty chroma.sqlite3 from the client, and then
+    # every folder in it would look orphaned.
+    if not args.store_existed:
+        raise SystemExit(f"{args.path} is not an existing ChromaDB store ({SQLITE_FILE} was missing).")
+    if not known_segments(args.path):
+        raise SystemExit(f"{args.path} has no segments registered in {SQLITE_FILE}; refusing to compact.")
+    for segment, owner in segment_directories(args.path).items():
+        if owner is None:
+            path = os.path.join(args.path, segment)
+            print(f"{'Would remove' if args.dry_run else 'Removing'} orphaned segment {segment} "
+                  f"({directory_size(path) / 1024:.1f} KiB)")
+            if not args.dry_run:
+                shutil.rmtree(path)
+    sqlite_path = os.path.join(args.path, SQLITE_FILE)
+    if os.path.exists(sqlite_path) and not args.dry_run:
+        with sqlite3.connect(sqlite_path) as conn:
+            conn.execute("VACUUM")
+
+
+def exact_neighbors(embeddings, queries, k, space):
+    if space == "cosine":
+        normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        scores = -(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normed.T
+    elif space == "ip":
+        scores = -queries @ embeddings.T
+    else:
+        scores = (
+            (queries ** 2).sum(axis=1, keepdims=True)
+            - 2 * queries @ embeddings.T
+            + (embeddings ** 2).sum(axis=1)
+        )
+    return np.argsort(scores, axis=1)[:, :k]
+
+
+def bench_recall(client, args):
+    """
+    Measure recall@k and per-query latency of HNSW against exact search, both
+    run one query at a time, using a sample of the collection's own embeddings
+    as queries. Each search_ef value is benchmarked on a fresh in-memory copy
+    of the collection.
+    """
+    collection = client.get_collection(args.collection)
+    records = read_all(collection, include=("embeddings",))
+    if not records["ids"]:
+        print(f"{args.collection} is empty.")
+        return
+    embeddings = np.asarray(records["embeddings"], dtype=np.float32)
+    ids = np.asarray(records["ids"])
+    rng = random.Random(0)
+    sample = rng.sample(range(len(ids)), min(args.queries, len(ids)))
+    queries = embeddings[sample]
+    k = min(args.k, len(ids))
+
+    space = args.space or hnsw_settings(args.collection)["space"]
+    base, exact_space = embeddings, space
+    if space == "cosine":
+        # Normalise the stored vectors once, as an index would, so each query is one dot product.
+        base, exact_space = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True), "ip"
+    # One query at a time, like the HNSW queries below, so the latencies compare.
+    started = time.perf_counter()
+    expected = ids[np.vstack([exact_neighbors(base, q[None, :], k, exact_space) for q in queries])]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(sample)
+    print(f"{args.collection}: {len(ids)} vectors, dim={embeddings.shape[1]}, {len(sample)} queries, k={k}")
+    print(f"  exact        recall=1.000  latency={exact_ms:.3f} ms/query")
+
+    memory = chromadb.EphemeralClient()
+    for search_ef in args.search_ef:
+        overrides = {"space": args.space, "M": args.M,
+                     "construction_ef": args.construction_ef, "search_ef": search_ef}
+        temp = memory.create_collection(
+            name=f"bench-{uuid.uuid4().hex[:8]}",
+            metadata=collection_metadata(args.collection, **overrides)
+        )
+        for start in range(0, len(ids), PAGE_SIZE):
+            temp.add(ids=records["ids"][start:start + PAGE_SIZE],
+                     embeddings=embeddings[start:start + PAGE_SIZE].tolist())
+        started = time.perf_counter()
+        found = [temp.query(query_embeddings=[q.tolist()], n_results=k, include=[])["ids"][0] for q in queries]
+        ann_ms = (time.perf_counter() - started) * 1000 / len(sample)
+        recall = np.mean([len(set(f) & set(e)) / k for f, e in zip(found, expected)])
+        print(f"  search_ef={search_ef:<4} recall={recall:.3f}  latency={ann_ms:.3f} ms/query  "
+              f"({hnsw_settings(args.collection, **overrides)})")
+        memory.delete_collection(temp.name)
+
+
+def migrate(client, args):
+    """
+    Re-embed every record of the source collection with another embedding
+    backend into that backend's collection, keeping ids, documents and metadata.
+    Records already in the target are skipped, so an interrupted migration can
+    simply be run again.
+    """
+    target_name = args.target or collection_for_backend(args.backend)
+    if target_name == args.source:
+        raise SystemExit("The target collection must differ from the source collection.")
+    embedding_function = make_embedding_function(args.backend)
+    source = client.get_collection(args.source)
+    target = get_or_create_collection(client, target_name, embedding_function)
+
+    records = read_all(source, include=("documents", "metadatas"))
+    existing = set(read_all(target, include=())["ids"])
+    todo = [i for i, doc_id in enumerate(records["ids"]) if doc_id not in existing]
+    print(f"Migrating {len(todo)} of {len(records['ids'])} records from {args.source} "
+          f"to {target_name} with the {args.backend} backend")
+
+    started = time.perf_counter()
+    for start in range(0, len(todo), args.batch_size):
+        batch = todo[start:start + args.batch_size]
+        documents = [records["documents"][i] for i in batch]
+        metadatas = [records["metadatas"][i] for i in batch]
+        target.add(
+            ids=[records["ids"][i] for i in batch],
+            documents=documents,
+            embeddings=embedding_function(documents),
+            metadatas=metadatas
+        )
+        print(f"  {start + len(batch)}/{len(todo)} records")
+    elapsed = time.perf_counter() - started
+    if todo:
+        print(f"Re-embedded {len(todo)} records in {elapsed:.1f} s ({len(todo) / elapsed:.1f} records/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChromaDB maintenance")
+    parser.add_argument("--path", default=CHROMA_PATH, help="persistent ChromaDB directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("stats").add_argument("--collection")
+
+    dedupe_parser = subparsers.add_parser("dedupe")
+    dedupe_parser.add_argument("--collection")
+    dedupe_parser.add_argument("--dry-run", action="store_true")
+
+    compact_parser = subparsers.add_parser("compact")
+    compact_parser.add_argument("--dry-run", action="store_true")
+
+    for name in ("rebuild", "bench-recall"):
+        sub = subparsers.add_parser(name)
+        sub.add_argument("--space", choices=["l2", "cosine", "ip"])
+        sub.add_argument("--M", type=int)
+        sub.add_argument("--construction-ef", type=int)
+        if name == "rebuild":
+            sub.add_argument("--collection")
+            sub.add_argument("--search-ef", type=int)
+            sub.set_defaults(dry_run=False)
+        else:
+            sub.add_argument("--collection", default=collection_for_backend())
+            sub.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+            sub.add_argument("-k", type=int, default=3)
+            sub.add_argument("--queries", type=int, default=200)
+
+    migrate_parser = subparsers.add_parser("migrate")
+    migrate_parser.add_argument("--source", default="rag_collection_demo")
+    migrate_parser.add_argument("--backend", choices=list(BACKENDS), default="sentence-transformers")
+    migrate_parser.add_argument("--target", help="default: the backend's collection")
+    migrate_parser.add_argument("--batch-size", type=int, default=64)
+
+    args = parser.parse_args()
+    args.store_existed = os.path.exists(os.path.join(args.path, SQLITE_FILE))
+    client = chromadb.PersistentClient(path=args.path)
+    commands = {"stats": stats, "dedupe": dedupe, "rebuild": rebuild,
+                "compact": compact, "bench-recall": bench_recall, "migrate": migrate}
+    commands[args.command](client, args)
+
+
+if __name__ == "__main__":
+    main()
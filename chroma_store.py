@@ -0,0 +1,95 @@
+"""
+ChromaDB collection settings shared by the Streamlit apps and chroma_maintenance.py.
+
+HNSW parameters are fixed when a collection is created; ``get_or_create_collection``
+ignores them for a collection that already exists. To change them for existing
+data, edit ``COLLECTION_SETTINGS`` and run ``python chroma_maintenance.py rebuild``.
+"""
+import os
+
+CHROMA_PATH = os.path.join(os.getcwd(), "chroma_db")
+
+# Chroma's own defaults, made explicit so they can be tuned deliberately.
+# Higher M / construction_ef give better recall at the cost of build time and
+# memory; higher search_ef gives better recall at the cost of query latency.
+DEFAULT_HNSW = {
+    "space": "l2",
+    "M": 16,
+    "construction_ef": 100,
+    "search_ef": 10,
+}
+
+# Per-collection overrides of DEFAULT_HNSW.
+COLLECTION_SETTINGS = {
+    "rag_collection_demo": {"search_ef": 50},
+    # Normalised sentence-transformer vectors, see embeddings.py.
+    "rag_collection_minilm": {"space": "cosine", "search_ef": 50},
+}
+
+ADD_BATCH_SIZE = 500
+
+
+def hnsw_settings(collection_name, **overrides):
+    settings = dict(DEFAULT_HNSW)
+    settings.update(COLLECTION_SETTINGS.get(collection_name, {}))
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return settings
+
+
+def collection_metadata(collection_name, description="RAG collection for documents", **overrides):
+    metadata = {"description": description}
+    for key, value in hnsw_settings(collection_name, **overrides).items():
+        metadata[f"hnsw:{key}"] = value
+    return metadata
+
+
+def get_or_create_collection(client, collection_name, embedding_function=None, **overrides):
+    return client.get_or_create_collection(
+        name=collection_name,
+        metadata=collection_metadata(collection_name, **overrides),
+        embedding_function=embedding_function
+    )
+
+
+def add_new_documents(collection, documents, ids, metadatas=None):
+    """
+    Add only the documents whose ids are not in the collection yet.
+    Chroma ignores duplicate ids on ``add`` but still embeds them first, so
+    re-uploading a file used to cost a full re-embedding for nothing.
+    Returns the ids that were actually added.
+    """
+    metadatas = metadatas or [None] * len(documents)
+    if not len(documents) == len(ids) == len(metadatas):
+        raise ValueError("documents, ids and metadatas must have the same length.")
+    existing = set(collection.get(ids=ids, include=[])["ids"])
+    new = [
+        (doc, doc_id, metadata)
+        for doc, doc_id, metadata in zip(documents, ids, metadatas)
+        if doc_id not in existing
+    ]
+    if not new:
+        print(f"All {len(ids)} documents are already in '{collection.name}'. Skipping add.")
+        return []
+
+    for start in range(0, len(new), ADD_BATCH_SIZE):
+        batch = new[start:start + ADD_BATCH_SIZE]
+        # Per-record metadata; Chroma takes None for a record without any (but not {}).
+        collection.add(
+            documents=[doc for doc, _, _ in batch],
+            ids=[doc_id for _, doc_id, _ in batch],
+            metadatas=[metadata or None for _, _, metadata in batch]
+        )
+    return [doc_id for _, doc_id, _ in new]
+
+
+def list_sources(collection):
+    """Distinct ``source`` values in a collection, for the retrieval filter widgets."""
+    sources = set()
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=1000, offset=offset)
+        if not page["ids"]:
+            break
+        sources.update(m["source"] for m in page["metadatas"] if m and m.get("source"))
+        offset += len(page["ids"])
+    return sorted(sources)
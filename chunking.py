@@ -0,0 +1,166 @@
+"""
+Structure-aware, streaming text chunker.
+
+Legal texts such as the Constitution are organised as Section -> Article ->
+numbered paragraph. Instead of cutting every 500 characters, the chunker
+reads the input line by line, never lets a chunk cross an Article or Section
+boundary, and packs whole paragraphs (or sentences of very long paragraphs)
+into chunks of about ``chunk_size`` characters. Plain text without any
+headings is simply packed paragraph by paragraph.
+"""
+import re
+from collections import namedtuple
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+# Section titles up to this length are carried into the first Article chunk
+# instead of becoming a chunk of their own.
+SECTION_TITLE_MAX = 100
+
+SECTION_RE = re.compile(r"^Section\s+([IVXLC]+)\b\.?(?:\s+[A-Z][^.]*)?$")
+ARTICLE_RE = re.compile(r"^Article\s+(\d+(?:-\d+)?)\.?$")
+PARAGRAPH_RE = re.compile(r"^\d+(?:-\d+)?[.)]\s")
+# Sentence ends, except after the abbreviation "No." (as in "Law No. 142-VII").
+SENTENCE_RE = re.compile(r"(?<=[.;:!?])(?<!\bNo\.)\s+")
+# A carried-over tail shorter than this is a fragment, not a sentence.
+MIN_TAIL_WORDS = 3
+
+Chunk = namedtuple("Chunk", ["text", "section", "article"])
+
+
+def iter_lines(source):
+    """
+    Yield stripped lines from a string, an open text file or any iterable of
+    text blocks (for example the pages of a PDF), without joining them first.
+    """
+    if isinstance(source, str):
+        source = [source]
+    for block in source:
+        for line in block.splitlines():
+            yield line.strip()
+
+
+def iter_blocks(lines):
+    """
+    Group lines into ("section" | "article" | "paragraph", value, text) blocks.
+    A paragraph ends at a blank line, a heading or the start of a numbered item;
+    wrapped lines inside a paragraph are joined with a single space.
+    """
+    paragraph = []
+    for line in lines:
+        section = SECTION_RE.match(line)
+        article = ARTICLE_RE.match(line)
+        if section or article or not line or PARAGRAPH_RE.match(line):
+            if paragraph:
+                yield "paragraph", None, " ".join(paragraph)
+                paragraph = []
+        if section:
+            yield "section", section.group(1), line
+        elif article:
+            yield "article", article.group(1), line
+        elif line:
+            paragraph.append(line)
+    if paragraph:
+        yield "paragraph", None, " ".join(paragraph)
+
+
+def split_long_text(text, chunk_size=CHUNK_SIZE):
+    """
+    Split a single paragraph that does not fit into one chunk, preferring
+    sentence boundaries, then word boundaries, then a hard cut.
+    """
+    if len(text) <= chunk_size:
+        yield text
+        return
+
+    current = ""
+    for sentence in SENTENCE_RE.split(text):
+        pieces = [sentence]
+        if len(sentence) > chunk_size:
+            pieces = sentence.split()
+        for piece in pieces:
+            while len(piece) > chunk_size:
+                if current:
+                    yield current
+                    current = ""
+                yield piece[:chunk_size]
+                piece = piece[chunk_size:]
+            if current and len(current) + 1 + len(piece) > chunk_size:
+                yield current
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        yield current
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Stream ``Chunk`` tuples out of ``source`` (see ``iter_lines``).
+
+    Article and Section headings are hard boundaries: the current chunk is
+    flushed and the heading starts the next one. When an Article is longer
+    than ``chunk_size`` it continues in a new chunk that repeats the Article
+    heading, and carries over the last sentence of the previous chunk only if
+    it fits in ``chunk_overlap`` characters. Since chunks already end on
+    paragraph or sentence boundaries, no other text is embedded twice.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    section = None
+    article = None
+    article_heading = None
+    headings = []
+    buffer = []
+    buffer_len = 0
+
+    def flush():
+        nonlocal buffer, buffer_len
+        chunk = Chunk("\n".join(buffer), section, article)
+        buffer = []
+        buffer_len = 0
+        return chunk
+
+    for kind, value, text in iter_blocks(iter_lines(source)):
+        if kind != "paragraph":
+            if kind == "article" and article is None and 0 < buffer_len <= SECTION_TITLE_MAX:
+                headings = buffer
+                flush()
+            elif buffer:
+                yield flush()
+            if kind == "section":
+                if headings:
+                    # Headings with no body of their own (e.g. an empty Article) are kept as text.
+                    yield Chunk("\n".join(headings), section, article)
+                section, article, article_heading = value, None, None
+                headings = [text]
+            else:
+                article, article_heading = value, text
+                headings.append(text)
+            continue
+
+        # Pending headings go in front of the first piece, so they count against its size.
+        headings_len = sum(len(h) + 1 for h in headings)
+        for piece in split_long_text(text, max(chunk_size - headings_len, 1)):
+            if headings:
+                buffer.extend(headings)
+                buffer_len += headings_len
+                headings = []
+            elif buffer and buffer_len + len(piece) > chunk_size:
+                tail = SENTENCE_RE.split(buffer[-1])[-1]
+                yield flush()
+                prefix = [article_heading] if article_heading else []
+                if len(tail) <= chunk_overlap and len(tail.split()) >= MIN_TAIL_WORDS:
+                    prefix.append(tail)
+                while prefix and sum(len(p) + 1 for p in prefix) + len(piece) > chunk_size:
+                    prefix.pop()
+                buffer.extend(prefix)
+                buffer_len += sum(len(p) + 1 for p in prefix)
+            buffer.append(piece)
+            buffer_len += len(piece) + 1
+
+    if buffer:
+        yield flush()
+    if headings:
+        yield Chunk("\n".join(headings), section, article)
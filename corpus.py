@@ -0,0 +1,78 @@
+"""
+Source metadata attached to every stored chunk, and the retrieval filters built on it.
+
+Every chunk carries the file or URL it came from (``source``), its
+``source_type`` (txt / pdf / html / text), the ``section`` and ``article`` it
+belongs to, the upload ``session`` and an optional ``corpus`` namespace.
+Retrieval takes a ``filters`` dict with any of the keys below; a list value
+matches any of its items, an empty value means "no restriction".
+"""
+import uuid
+
+FILTER_KEYS = ("corpus", "source", "source_type", "article", "session")
+
+
+def new_session_id():
+    return uuid.uuid4().hex[:12]
+
+
+def source_type(file_name):
+    if file_name.startswith(("http://", "https://")):
+        return "html"
+    if "." in file_name:
+        return file_name.rsplit(".", 1)[-1].lower()
+    return "text"
+
+
+def chunk_metadata(chunk, source, session=None, corpus=None, kind=None):
+    """Metadata for one ``chunking.Chunk``; keys with no value are left out."""
+    metadata = {
+        "source": source,
+        "source_type": kind or source_type(source),
+        "section": chunk.section,
+        "article": chunk.article,
+        "session": session,
+        "corpus": corpus,
+    }
+    return {key: value for key, value in metadata.items() if value}
+
+
+def chunk_id(source, index, corpus=None):
+    return f"{corpus}/{source}_chunk_{index}" if corpus else f"{source}_chunk_{index}"
+
+
+def normalize_filters(filters):
+    """Drop empty filters and turn every value into a list of strings."""
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if key not in FILTER_KEYS:
+            raise ValueError(f"Unknown filter '{key}', expected one of {FILTER_KEYS}")
+        values = [value] if isinstance(value, str) else list(value or [])
+        values = [str(v).strip() for v in values if str(v).strip()]
+        if values:
+            normalized[key] = values
+    return normalized
+
+
+def chroma_where(filters):
+    """Build a ChromaDB ``where`` clause, or None when nothing is filtered."""
+    clauses = [
+        {key: values[0]} if len(values) == 1 else {key: {"$in": values}}
+        for key, values in normalize_filters(filters).items()
+    ]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def mongo_filter(filters):
+    """Build a MongoDB query document over the ``metadata`` sub-document."""
+    return {
+        f"metadata.{key}": values[0] if len(values) == 1 else {"$in": values}
+        for key, values in normalize_filters(filters).items()
+    }
+
+
+def parse_articles(text):
+    """Turn "1, 12, 3-1" from a text box into a list of Article numbers."""
+    return [part.strip() for part in (text or "").split(",") if part.strip()]
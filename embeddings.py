@@ -0,0 +1,87 @@
+"""
+Embedding backends for the ChromaDB apps.
+
+"sentence-transformers" (the default) embeds locally with the same compact
+multilingual MiniLM model the MongoDB app uses (384-dim, normalised). "ollama"
+keeps the original behaviour of embedding with the llama3.2 chat model over
+HTTP. Vectors from different backends are not comparable, so each backend has
+its own collection; ``python chroma_maintenance.py migrate`` re-embeds an
+existing collection into the collection of another backend.
+
+Select the backend with the EMBEDDING_BACKEND environment variable. The
+sentence-transformers backend can run on ONNX Runtime with int8 weights
+instead of PyTorch via EMBEDDING_INFERENCE (see onnx_embeddings.py).
+"""
+import os
+from functools import lru_cache
+
+from langchain_ollama import OllamaEmbeddings
+
+from onnx_embeddings import load_encoder
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "sentence-transformers")
+
+BACKENDS = {
+    "sentence-transformers": {
+        "model": "paraphrase-multilingual-MiniLM-L12-v2",
+        "collection": "rag_collection_minilm",
+    },
+    "ollama": {
+        "model": "llama3.2",
+        "collection": "rag_collection_demo",
+    },
+}
+
+
+class ChromaDBEmbeddingFunction:
+    def __init__(self, langchain_embeddings):
+        self.langchain_embeddings = langchain_embeddings
+
+    def __call__(self, input):
+        if isinstance(input, str):
+            input = [input]
+        elif not isinstance(input, list):
+            raise ValueError("Input to the embedding function must be a string or a list of strings.")
+        return self.langchain_embeddings.embed_documents(input)
+
+
+class SentenceTransformerEmbeddings:
+    """Local sentence-embedding model with the embed_documents / embed_query interface of langchain."""
+
+    def __init__(self, model_name, batch_size=64):
+        self.model = load_encoder(model_name)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        return self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        ).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def backend_settings(backend=None):
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {list(BACKENDS)}")
+    return BACKENDS[backend]
+
+
+def collection_for_backend(backend=None):
+    return backend_settings(backend)["collection"]
+
+
+@lru_cache(maxsize=None)
+def make_embedding_function(backend=None, model=None):
+    """
+    Build (once per process) the ChromaDB embedding function for a backend.
+    Streamlit re-runs the app script on every interaction, so the model must
+    not be reloaded each time.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    model = model or backend_settings(backend)["model"]
+    if backend == "ollama":
+        return ChromaDBEmbeddingFunction(OllamaEmbeddings(model=model, base_url=OLLAMA_BASE_URL))
+    return ChromaDBEmbeddingFunction(SentenceTransformerEmbeddings(model))
@@ -0,0 +1,200 @@
+"""
+HTTP fetch layer for the URL ingestion paths (read_html, get_constitution_text).
+
+All requests go through one pooled ``requests.Session`` with connect/read
+timeouts and retries with backoff on connection errors and 429/5xx replies.
+Responses are kept in an on-disk cache (``FETCH_CACHE_PATH``) and
+revalidated with conditional GET (If-None-Match / If-Modified-Since), so an
+unchanged page costs one 304 round trip. The text extracted from a page is
+cached next to the response, so it is not parsed again either.
+
+``fetch_many`` crawls several URLs concurrently, with at most
+``PER_HOST_LIMIT`` requests in flight per host. That limit also applies to
+ingestion worker threads that call ``fetch`` at the same time.
+
+Extraction parses only the target elements (``SoupStrainer``) and uses lxml
+when it is installed.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+FETCH_CACHE_PATH = os.path.join(os.getcwd(), "http_cache")
+TIMEOUT = (5, 30)  # seconds to connect, seconds between bytes of the reply
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+PER_HOST_LIMIT = 4
+MAX_WORKERS = 8
+USER_AGENT = "constitution-rag/1.0"
+
+FetchResult = namedtuple("FetchResult", ["url", "status", "text", "from_cache", "changed", "key"])
+
+
+def cache_key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def extract_text(html, name=None, attrs=None, separator="", find_all=False):
+    """
+    Text of the first element matching ``name``/``attrs`` (all of the page if
+    no name is given), like ``soup.find``. With ``find_all``, the text of every
+    outermost match, one per line; matches nested in another match are part of
+    its text and are not repeated. Only the matching elements are parsed.
+    """
+    if name is None:
+        return BeautifulSoup(html, HTML_PARSER).get_text(separator)
+    strainer = SoupStrainer(name, attrs=attrs or {})
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=strainer)
+    # The strainer keeps each outermost match, with its subtree, as a top-level element.
+    matches = soup.find_all(name, attrs=attrs or {}, recursive=False, limit=None if find_all else 1)
+    return "\n".join(element.get_text(separator) for element in matches)
+
+
+class Fetcher:
+    def __init__(self, cache_path=FETCH_CACHE_PATH, timeout=TIMEOUT, retries=RETRIES,
+                 per_host_limit=PER_HOST_LIMIT, max_workers=MAX_WORKERS):
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self.per_host_limit = per_host_limit
+        self.max_workers = max_workers
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries, backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _file(self, key, suffix):
+        return os.path.join(self.cache_path, f"{key}.{suffix}")
+
+    def _read_cache(self, key):
+        try:
+            with open(self._file(key, "json"), encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(self._file(key, "body"), "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return entry, body
+
+    def _write(self, path, data):
+        # Write to a temporary file first, so a concurrent reader never sees half a file.
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_cache(self, key, entry, body):
+        os.makedirs(self.cache_path, exist_ok=True)
+        self._write(self._file(key, "body"), body)
+        self._write(self._file(key, "json"), json.dumps(entry).encode("utf-8"))
+
+    def fetch(self, url):
+        """
+        GET ``url``, revalidating a cached copy when there is one. Raises
+        ``requests.RequestException`` on network errors and error statuses.
+        """
+        key = cache_key(url)
+        entry, body = self._read_cache(key)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self._slot(url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and entry:
+            return FetchResult(url, 304, body.decode(entry["encoding"], errors="replace"), True, False, key)
+        response.raise_for_status()
+
+        encoding = response.encoding or response.apparent_encoding or "utf-8"
+        new_entry = {
+            "url": url, "status": response.status_code, "encoding": encoding,
+            "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+            "fetched": time.time(),
+        }
+        # Servers without validators still get a cached copy: an identical body counts as unchanged.
+        changed = body != response.content
+        self._write_cache(key, new_entry, response.content)
+        return FetchResult(url, response.status_code, response.text, False, changed, key)
+
+    def fetch_text(self, url, name=None, attrs=None, separator="", find_all=False):
+        """
+        The text of the matching elements of ``url`` (see ``extract_text``).
+        When the page has not changed, the text extracted last time is reused.
+        """
+        result = self.fetch(url)
+        selector = hashlib.sha1(
+            json.dumps([name, attrs, separator, find_all], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        text_file = self._file(f"{result.key}.{selector[:12]}", "txt")
+        if not result.changed and os.path.exists(text_file):
+            with open(text_file, encoding="utf-8") as f:
+                return f.read()
+
+        text = extract_text(result.text, name, attrs, separator, find_all)
+        self._write(text_file, text.encode("utf-8"))
+        return text
+
+    def fetch_many(self, urls, name=None, attrs=None, separator="", find_all=False):
+        """
+        Fetch ``urls`` concurrently and return {url: text or exception}, so
+        one failing or slow site does not stop the others.
+        """
+        def fetch_one(url):
+            try:
+                return self.fetch_text(url, name, attrs, separator, find_all)
+            except requests.RequestException as e:
+                logging.error(f"Failed to fetch {url}: {e}")
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(urls, executor.map(fetch_one, urls)))
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher():
+    """The process-wide Fetcher, shared so every caller uses the same connection pool and host limits."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
@@ -0,0 +1,215 @@
+"""
+Background ingestion queue with chunk-batch checkpoints.
+
+Uploads and URL imports are turned into jobs that worker threads parse, chunk
+and embed in batches of ``batch_size`` chunks. After every batch the job's
+progress is written to ``<path>/<job id>.json`` next to its raw payload, so a
+job interrupted by a restart resumes from the last finished batch instead of
+starting over. Chunk ids are deterministic and the add function is expected to
+skip ids that are already stored (see ``chroma_store.add_new_documents``), so
+a batch that was half-written before a crash is simply completed.
+
+Job states: queued -> running -> done | failed | cancelling -> cancelled.
+Cancelling a running job deletes the chunks it added itself; chunks that were
+already stored (e.g. by an earlier upload of the same file) are left alone.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from chunking import iter_chunks
+from corpus import chunk_id, chunk_metadata
+
+JOBS_PATH = os.path.join(os.getcwd(), "ingest_jobs")
+BATCH_SIZE = 32
+WORKERS = 2
+
+
+class IngestJobQueue:
+    def __init__(self, parse, add_batch, delete_ids, path=JOBS_PATH, workers=WORKERS, batch_size=BATCH_SIZE):
+        """
+        parse(kind, data) -> text turns a raw payload (file bytes, or a URL for
+        kind "html") into text; add_batch(texts, ids, metadatas) stores one
+        batch and returns the ids it actually added; delete_ids(ids) removes
+        those chunks when a job is cancelled.
+        """
+        self.parse = parse
+        self.add_batch = add_batch
+        self.delete_ids = delete_ids
+        self.path = path
+        self.batch_size = batch_size
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+        os.makedirs(path, exist_ok=True)
+        self._resume_checkpoints()
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    # --- public API, safe to call from the Streamlit script thread ---
+
+    def submit(self, name, data, kind, session=None, corpus=None):
+        """
+        Queue ``data`` for ingestion and return the job id. Submitting the same
+        payload while its job is listed returns the existing job instead of
+        creating a new one.
+        """
+        job_id = hashlib.sha1(f"{corpus}\0{name}\0{kind}\0".encode("utf-8") + data).hexdigest()[:16]
+        with self._lock:
+            if job_id in self.jobs:
+                return job_id
+            with open(self._file(job_id, "bin"), "wb") as f:
+                f.write(data)
+            self.jobs[job_id] = {
+                "id": job_id, "name": name, "kind": kind, "session": session, "corpus": corpus,
+                "status": "queued", "total": None, "done": 0, "added": 0, "added_ids": [], "error": None,
+                "created": time.time(),
+            }
+            self._save(job_id)
+        self._queue.put(job_id)
+        return job_id
+
+    def list_jobs(self):
+        with self._lock:
+            return sorted((dict(job) for job in self.jobs.values()), key=lambda job: job["created"])
+
+    def finished_count(self):
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job["status"] == "done")
+
+    def cancel(self, job_id):
+        """Stop a job and remove the chunks it already stored."""
+        with self._lock:
+            job = self.jobs[job_id]
+            status = job["status"]
+            if status in ("queued", "failed") and not job["done"]:
+                # Nothing was stored yet, so there is nothing to delete.
+                job["status"] = "cancelled"
+            elif status in ("queued", "running", "failed"):
+                job["status"] = "cancelling"
+            self._save(job_id)
+        if status == "failed" and job["done"]:
+            self._queue.put(job_id)
+
+    def retry(self, job_id):
+        """Re-queue a failed job (resuming from its checkpoint) or a cancelled one."""
+        with self._lock:
+            job = self.jobs[job_id]
+            if job["status"] not in ("failed", "cancelled"):
+                return
+            job.update(status="queued", error=None)
+            self._save(job_id)
+        self._queue.put(job_id)
+
+    def clear_finished(self):
+        with self._lock:
+            for job_id in [i for i, job in self.jobs.items() if job["status"] in ("done", "cancelled")]:
+                del self.jobs[job_id]
+                for extension in ("json", "bin", "txt"):
+                    if os.path.exists(self._file(job_id, extension)):
+                        os.remove(self._file(job_id, extension))
+
+    # --- worker side ---
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logging.exception(f"Ingestion job {job_id} failed")
+                self._update(job_id, status="failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        with self._lock:
+            job = dict(self.jobs.get(job_id) or {})
+        if job.get("status") not in ("queued", "cancelling"):
+            return
+
+        chunks = list(iter_chunks(self._load_text(job)))
+        ids = [chunk_id(job["name"], i, job["corpus"]) for i in range(len(chunks))]
+        with self._lock:
+            self.jobs[job_id]["total"] = len(chunks)
+            if self.jobs[job_id]["status"] == "queued":
+                self.jobs[job_id]["status"] = "running"
+            self._save(job_id)
+
+        done, added_ids = job["done"], list(job.get("added_ids", []))
+        for start in range(done, len(chunks), self.batch_size):
+            if self._status(job_id) == "cancelling":
+                break
+            batch = chunks[start:start + self.batch_size]
+            added_ids.extend(self.add_batch(
+                [chunk.text for chunk in batch],
+                ids[start:start + len(batch)],
+                [chunk_metadata(chunk, job["name"], job["session"], job["corpus"], job["kind"]) for chunk in batch]
+            ) or [])
+            done = start + len(batch)
+            self._update(job_id, done=done, added=len(added_ids), added_ids=added_ids)
+
+        if self._status(job_id) == "cancelling":
+            if added_ids:
+                self.delete_ids(added_ids)
+            self._update(job_id, status="cancelled", done=0, added=0, added_ids=[])
+            return
+
+        self._update(job_id, status="done")
+        for extension in ("bin", "txt"):
+            if os.path.exists(self._file(job_id, extension)):
+                os.remove(self._file(job_id, extension))
+        logging.info(f"Ingestion job {job_id} ({job['name']}) finished: {len(added_ids)} new chunks")
+
+    def _load_text(self, job):
+        """Parse the payload once and keep the text, so a resumed job skips parsing."""
+        text_file = self._file(job["id"], "txt")
+        if os.path.exists(text_file):
+            with open(text_file, encoding="utf-8") as f:
+                return f.read()
+        with open(self._file(job["id"], "bin"), "rb") as f:
+            text = self.parse(job["kind"], f.read())
+        with open(text_file, "w", encoding="utf-8") as f:
+            f.write(text)
+        return text
+
+    # --- checkpoints ---
+
+    def _resume_checkpoints(self):
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.path, name), encoding="utf-8") as f:
+                job = json.load(f)
+            if job["status"] == "running":
+                job["status"] = "queued"
+            self.jobs[job["id"]] = job
+            if job["status"] in ("queued", "cancelling"):
+                logging.info(f"Resuming ingestion job {job['id']} ({job['name']}) at chunk {job['done']}")
+                self._queue.put(job["id"])
+
+    def _file(self, job_id, extension):
+        return os.path.join(self.path, f"{job_id}.{extension}")
+
+    def _save(self, job_id):
+        """Write the checkpoint atomically; the caller holds the lock."""
+        temp_file = self._file(job_id, "json.tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self.jobs[job_id], f)
+        os.replace(temp_file, self._file(job_id, "json"))
+
+    def _status(self, job_id):
+        with self._lock:
+            return self.jobs[job_id]["status"]
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            if job_id not in self.jobs:
+                return
+            self.jobs[job_id].update(changes)
+            self._save(job_id)
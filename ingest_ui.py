@@ -0,0 +1,72 @@
+"""
+Streamlit widgets for the background ingestion queue (ingest_jobs.py), shared
+by the ChromaDB apps.
+"""
+import streamlit as st
+
+from ingest_jobs import IngestJobQueue
+
+
+@st.cache_resource
+def get_ingest_queue(_parse, _add_batch, _delete_ids):
+    # One queue (and one set of worker threads) per server process, shared by all sessions.
+    # The leading underscores keep Streamlit from hashing the callbacks.
+    return IngestJobQueue(_parse, _add_batch, _delete_ids)
+
+
+def submit_sources(ingest_queue, uploaded_files=(), urls=(), session=None, corpus=None):
+    """
+    Queue uploaded files and URLs; each one is its own job. Streamlit re-runs
+    the script with the same widget values on every interaction, so each upload
+    and URL is submitted once per session while it stays in its widget. Removing
+    it, or uploading the file / entering the URL again, submits it again.
+    """
+    current = {f"file:{f.file_id}" for f in uploaded_files} | {f"url:{url}" for url in urls}
+    submitted = st.session_state.get("submitted_sources", set()) & current
+    st.session_state.submitted_sources = submitted
+    for uploaded_file in uploaded_files:
+        if f"file:{uploaded_file.file_id}" in submitted:
+            continue
+        file_extension = uploaded_file.name.split(".")[-1].lower()
+        ingest_queue.submit(uploaded_file.name, uploaded_file.getvalue(), file_extension,
+                            session=session, corpus=corpus)
+        submitted.add(f"file:{uploaded_file.file_id}")
+    for url in urls:
+        if f"url:{url}" in submitted:
+            continue
+        ingest_queue.submit(url, url.encode("utf-8"), "html", session=session, corpus=corpus)
+        submitted.add(f"url:{url}")
+
+
+@st.fragment(run_every=2)
+def show_ingest_jobs(ingest_queue, on_finished=None):
+    # Let the app refresh its source filter once more jobs have finished.
+    finished = ingest_queue.finished_count()
+    if "finished_jobs" not in st.session_state:
+        st.session_state.finished_jobs = finished
+    if finished != st.session_state.finished_jobs:
+        increased = finished > st.session_state.finished_jobs
+        st.session_state.finished_jobs = finished
+        if increased:
+            if on_finished:
+                on_finished()
+            st.rerun(scope="app")
+
+    jobs = ingest_queue.list_jobs()
+    if not jobs:
+        return
+    st.header("Ingestion Jobs")
+    for job in jobs:
+        total = job["total"] or 0
+        st.progress(
+            job["done"] / total if total else 0.0,
+            text=f"{job['name']}: {job['status']} ({job['done']}/{total or '?'} chunks)"
+        )
+        if job["error"]:
+            st.caption(job["error"])
+        if job["status"] in ("queued", "running", "failed") and st.button("Cancel", key=f"cancel_{job['id']}"):
+            ingest_queue.cancel(job["id"])
+        if job["status"] in ("failed", "cancelled") and st.button("Retry", key=f"retry_{job['id']}"):
+            ingest_queue.retry(job["id"])
+    if st.button("Clear finished jobs"):
+        ingest_queue.clear_finished()
@@ -1,50 +1,40 @@
 import os
-import requests
-from bs4 import BeautifulSoup
 import streamlit as st
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
+from langchain_ollama import OllamaLLM
 import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chunking import iter_chunks
+from chroma_store import CHROMA_PATH, add_new_documents, get_or_create_collection, list_sources
+from embeddings import collection_for_backend, make_embedding_function
+from corpus import chroma_where, chunk_id, chunk_metadata, new_session_id, parse_articles
+from ingest_ui import get_ingest_queue, show_ingest_jobs, submit_sources
+from fetcher import get_fetcher
 import fitz
+from io import BytesIO
 import tempfile
 
 # Constants
 LLM_MODEL = "llama3.2"
-BASE_URL = "http://localhost:11434"
+BASE_URL = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 
 # Initialize ChromaDB client
-chroma_client = chromadb.PersistentClient(path=os.path.join(os.getcwd(), "chroma_db"))
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 
-# ChromaDB embedding function
-class ChromaDBEmbeddingFunction:
-    def __init__(self, langchain_embeddings):
-        self.langchain_embeddings = langchain_embeddings
-
-    def __call__(self, input):
-        if isinstance(input, str):
-            input = [input]
-        elif not isinstance(input, list):
-            raise ValueError("Input to the embedding function must be a string or a list of strings.")
-        return self.langchain_embeddings.embed_documents(input)
-
-# Initialize Ollama embeddings
-embedding = ChromaDBEmbeddingFunction(
-    langchain_embeddings=OllamaEmbeddings(model=LLM_MODEL, base_url=BASE_URL)
-)
+# Embedding backend (see embeddings.py)
+embedding = make_embedding_function()
 
 # Create or get ChromaDB collection
-collection_name = "rag_collection_demo"
-collection = chroma_client.get_or_create_collection(
-    name=collection_name,
-    metadata={"description": "RAG collection for documents"},
-    embedding_function=embedding
-)
+collection_name = collection_for_backend()
+collection = get_or_create_collection(chroma_client, collection_name, embedding)
 
 # Function to add documents to ChromaDB collection
-def add_documents_to_collection(documents, ids):
+def add_documents_to_collection(documents, ids, metadatas=None):
     if not documents or not ids:
         raise ValueError("Documents or IDs are empty, cannot add to collection")
-    collection.add(documents=documents, ids=ids)
+    return add_new_documents(collection, documents, ids, metadatas)
+
+# Function to remove documents from ChromaDB collection
+def delete_documents_from_collection(ids):
+    collection.delete(ids=ids)
 
 # Function to read PDF files
 def read_pdf(file):
@@ -64,45 +54,53 @@ def read_pdf(file):
 
 # Function to read HTML content from URL
 def read_html(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    content = soup.find("div", class_="content")
-    return content.get_text() if content else ""
+    # Pooled, cached fetch with timeouts and retries; only the content div is parsed (see fetcher.py).
+    return get_fetcher().fetch_text(url, "div", {"class": "content"})
+
+# Function to turn an ingestion job payload into text
+def read_source(kind, data):
+    """Runs on an ingestion worker thread: data is the file bytes, or the URL for kind "html"."""
+    if kind == "pdf":
+        return read_pdf(BytesIO(data))
+    if kind == "html":
+        return read_html(data.decode("utf-8"))
+    return data.decode("utf-8")
 
 # Function to process and add documents to ChromaDB collection
-def process_and_add_documents(content, file_name_prefix=""):
+def process_and_add_documents(content, file_name_prefix="", session=None, corpus=None):
     if not content:
         print(f"Warning: Content from {file_name_prefix} is empty. Skipping processing.")
-        return
+        return []
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = text_splitter.split_text(content)
+    chunks = list(iter_chunks(content))
 
     if not chunks:
         print(f"No chunks found in the content of {file_name_prefix}")
     else:
         print(f"Splitting content into {len(chunks)} chunks for {file_name_prefix}.")
 
-    chunk_ids = [f"{file_name_prefix}_chunk_{i}" for i in range(len(chunks))]
+    chunk_ids = [chunk_id(file_name_prefix, i, corpus) for i in range(len(chunks))]
+    metadatas = [chunk_metadata(chunk, file_name_prefix, session, corpus) for chunk in chunks]
 
     if not chunks or not chunk_ids:
         print(f"Warning: No valid chunks or chunk IDs for {file_name_prefix}. Skipping add to collection.")
-        return
+        return []
 
-    add_documents_to_collection(chunks, chunk_ids)
+    return add_documents_to_collection([chunk.text for chunk in chunks], chunk_ids, metadatas)
 
 # Function to perform RAG pipeline for query processing
-def rag_pipeline(query_text):
-    retrieved_docs = query_chromadb(query_text)
+def rag_pipeline(query_text, filters=None):
+    retrieved_docs = query_chromadb(query_text, where=chroma_where(filters))
     context = " ".join(doc for docs in retrieved_docs for doc in docs) if retrieved_docs else ""
     prompt = f"{context} {query_text}" if context else query_text
     return query_ollama(prompt)
 
 # Function to query ChromaDB for documents
-def query_chromadb(query_text, n_results=3):
+def query_chromadb(query_text, n_results=3, where=None):
     results = collection.query(
         query_texts=[query_text],
-        n_results=n_results
+        n_results=n_results,
+        where=where
     )
     return results["documents"]
 
@@ -114,6 +112,13 @@ def query_ollama(prompt):
 # Initialize Streamlit app
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "upload_session" not in st.session_state:
+    st.session_state.upload_session = new_session_id()
+if "sources" not in st.session_state:
+    st.session_state.sources = list_sources(collection)
+
+def refresh_sources():
+    st.session_state.sources = list_sources(collection)
 
 def main():
     st.title("Interactive AI Assistant")
@@ -124,26 +129,23 @@ def main():
     uploaded_files = st.sidebar.file_uploader(
         "Upload .txt or .pdf files", type=["txt", "pdf"], accept_multiple_files=True
     )
-    url = st.sidebar.text_input("Enter URL to HTML version of document")
+    corpus = st.sidebar.text_input("Corpus (optional namespace)").strip()
+    urls = st.sidebar.text_input("Enter URL(s) to HTML version of document, separated by spaces").split()
 
-    # Process uploaded files
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            file_extension = uploaded_file.name.split(".")[-1].lower()
-
-            if file_extension == "txt":
-                content = uploaded_file.read().decode("utf-8")
-            elif file_extension == "pdf":
-                content = read_pdf(uploaded_file)
+    ingest_queue = get_ingest_queue(read_source, add_documents_to_collection, delete_documents_from_collection)
 
-            process_and_add_documents(content, file_name_prefix=uploaded_file.name)
+    # Queue uploaded files and URLs for background ingestion
+    submit_sources(ingest_queue, uploaded_files or [], urls, st.session_state.upload_session, corpus)
+    if uploaded_files:
+        st.sidebar.success(f"Queued {len(uploaded_files)} file(s) for ingestion.")
 
-        st.sidebar.success(f"Uploaded and processed {len(uploaded_files)} file(s).")
+    with st.sidebar:
+        show_ingest_jobs(ingest_queue, refresh_sources)
 
-    # Process URL input
-    if url:
-        content = read_html(url)
-        process_and_add_documents(content, file_name_prefix="html_version")
+    st.sidebar.header("Search Scope")
+    selected_sources = st.sidebar.multiselect("Search only these sources", st.session_state.sources)
+    articles = st.sidebar.text_input("Restrict to Articles (e.g. 1, 12, 3-1)")
+    filters = {"corpus": corpus, "source": selected_sources, "article": parse_articles(articles)}
 
     # Handle user input queries
     prompt = st.chat_input("Ask your question(s):")
@@ -165,7 +167,7 @@ def main():
                     for q in prompts:
                         q = q.strip()  # Clean up any extra spaces
                         if q:
-                            response_message = rag_pipeline(q)
+                            response_message = rag_pipeline(q, filters)
                             response_messages.append(response_message)
                             st.session_state.messages.append({"role": "assistant", "content": response_message})
 
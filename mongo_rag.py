@@ -0,0 +1,247 @@
+"""
+MongoDB retrieval and answer pipelines: storage, similarity search, plain RAG
+and Multiquery / RAG Fusion. Kept free of Streamlit code so the pipelines can
+be called directly, e.g. by benchmarks/load_test.py; app.py builds the UI on top.
+"""
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from langchain_ollama import OllamaLLM
+from pymongo import MongoClient
+import numpy as np
+import requests
+from chunking import iter_chunks
+from corpus import chunk_metadata, mongo_filter
+from fetcher import get_fetcher
+from onnx_embeddings import load_encoder
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.environ.get("MONGO_DB", "rag_db")
+
+# Подключение к базе данных MongoDB
+mongo_client = MongoClient(MONGO_URI)
+mongo_db = mongo_client[MONGO_DB]
+collection = mongo_db["documents"]
+collection.create_index([("metadata.corpus", 1), ("metadata.source", 1)])
+
+class EmbeddingFunction:
+    def __init__(self, model_name):
+        # SentenceTransformer, or ONNX Runtime (int8) when EMBEDDING_INFERENCE is set.
+        self.model = load_encoder(model_name)
+
+    def call(self, input):
+        if isinstance(input, str):
+            input = [input]
+        vectors = self.model.encode(input)
+        if len(vectors) == 0:
+            raise ValueError("Empty embedding generated.")
+        return vectors
+
+
+embedding = EmbeddingFunction("paraphrase-multilingual-MiniLM-L12-v2")
+
+
+def add_document_to_mongodb(documents, ids, sources=None, session=None, corpus=None):
+    """
+    Split each document into structure-aware chunks and store one embedded
+    record per chunk, so nothing past the model's input limit is silently lost.
+    Each chunk is tagged with its source, Article, upload session and corpus.
+    """
+    if len(ids) != len(documents) or (sources is not None and len(sources) != len(documents)):
+        raise ValueError("documents, ids and sources must have the same length.")
+    try:
+        for doc, doc_id, source in zip(documents, ids, sources or ids):
+            if not doc.strip():
+                raise ValueError("Cannot add an empty or whitespace-only document.")
+
+            chunks = list(iter_chunks(doc))
+            embedding_vectors = embedding.call([chunk.text for chunk in chunks])
+
+            logging.info(f"Generated {len(chunks)} chunk embeddings for document '{doc_id}'")
+
+            collection.insert_many([
+                {
+                    "_id": f"{doc_id}_chunk_{i}",
+                    "parent_id": doc_id,
+                    "document": chunk.text,
+                    "metadata": chunk_metadata(chunk, source, session, corpus),
+                    "embedding": vector.tolist()
+                }
+                for i, (chunk, vector) in enumerate(zip(chunks, embedding_vectors))
+            ])
+    except Exception as e:
+        logging.error(f"Error adding document: {e}")
+        raise
+
+def next_document_id():
+    """Number new documents by the parent documents stored, not by their chunks."""
+    n = len(collection.distinct("parent_id")) + 1
+    while collection.count_documents({"$or": [{"_id": f"doc{n}"}, {"parent_id": f"doc{n}"}]}, limit=1):
+        n += 1
+    return f"doc{n}"
+
+def query_chunks_from_mongodb(query_text, n_results=1, filters=None):
+    """
+    Return the ``n_results`` most similar chunk records (``document`` and
+    ``parent_id``), scanning only the records that match ``filters`` (see corpus.py).
+    """
+    try:
+        query_embedding = embedding.call(query_text)[0]
+        docs = list(collection.find(mongo_filter(filters), {"document": 1, "parent_id": 1, "embedding": 1}))
+        if not docs:
+            return []
+
+        doc_embeddings = np.array([doc["embedding"] for doc in docs])
+        similarities = doc_embeddings @ query_embedding / (
+            np.linalg.norm(doc_embeddings, axis=1) * np.linalg.norm(query_embedding)
+        )
+
+        top_results = np.argsort(-similarities)[:n_results]
+        return [docs[i] for i in top_results]
+    except Exception as e:
+        logging.error(f"Error querying documents: {e}")
+        return []
+
+def query_documents_from_mongodb(query_text, n_results=1, filters=None):
+    """Return the text of the ``n_results`` most similar chunks."""
+    return [doc["document"] for doc in query_chunks_from_mongodb(query_text, n_results, filters)]
+
+def query_with_ollama(prompt, model_name):
+    try:
+        logging.info(f"Sending prompt to Ollama with model {model_name}: {prompt}")
+        llm = OllamaLLM(model=model_name)
+        response = llm.invoke(prompt)
+        logging.info(f"Ollama response: {response}")
+        return response
+    except Exception as e:
+        logging.error(f"Error with Ollama query: {e}")
+        return f"Error with Ollama API: {e}"
+
+def retrieve_and_answer(query_text, model_name, filters=None, n_results=3):
+    # One chunk is much less text than the whole document used to be, so take a few
+    # and keep chunks of the same document together, best match first.
+    grouped = OrderedDict()
+    for doc in query_chunks_from_mongodb(query_text, n_results, filters):
+        grouped.setdefault(doc.get("parent_id", doc["_id"]), []).append(doc["document"])
+    retrieved_docs = ["\n".join(chunks) for chunks in grouped.values()]
+    context = "\n\n".join(retrieved_docs) if retrieved_docs else "No relevant documents found."
+
+    augmented_prompt = f"Context: {context}\n\nQuestion: {query_text}\nAnswer:"
+    return query_with_ollama(augmented_prompt, model_name)
+
+# Функция для извлечения текста с сайта Конституции Республики Казахстан
+def get_constitution_text():
+    url = "https://www.akorda.kz/en/constitution-of-the-republic-of-kazakhstan-50912"
+    try:
+        # Conditional GET against the on-disk cache: an unchanged page is neither downloaded nor parsed again.
+        constitution_text = get_fetcher().fetch_text(url, "p", find_all=True) + "\n"
+    except requests.RequestException as e:
+        logging.error(f"Error fetching the Constitution text from the website: {e}")
+        return "Error fetching the Constitution text from the website."
+    logging.info(f"Extracted Constitution text: {constitution_text[:500]}...")  # Покажем первые 500 символов
+    return constitution_text
+
+# === Context summaries ===
+# A summary depends only on its context and model, so it is generated once per
+# context hash, in the background, and shared by every later question.
+SUMMARY_CACHE_SIZE = 32
+summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+_summaries = OrderedDict()
+_summaries_lock = threading.Lock()
+
+
+def summary_key(context, model_name):
+    return hashlib.sha256(f"{model_name}\0{context}".encode("utf-8")).hexdigest()
+
+
+def summarize_context(context, model_name):
+    """
+    Return a Future with the summary of ``context``. A cached or in-flight
+    summary for the same context is reused; failed generations are not cached.
+    """
+    key = summary_key(context, model_name)
+    with _summaries_lock:
+        if key in _summaries:
+            _summaries.move_to_end(key)
+            return _summaries[key]
+        future = summary_executor.submit(
+            query_with_ollama, f"Summarize the following content: {context}", model_name
+        )
+        _summaries[key] = future
+        while len(_summaries) > SUMMARY_CACHE_SIZE:
+            _summaries.popitem(last=False)
+
+    def forget_failure(done):
+        if done.exception() or str(done.result()).startswith("Error with Ollama API"):
+            with _summaries_lock:
+                if _summaries.get(key) is done:
+                    del _summaries[key]
+
+    future.add_done_callback(forget_failure)
+    return future
+
+
+# === Multiquery and RAG Fusion Functions ===
+def generate_alternative_queries(question, model, num_queries=5):
+    """
+    Generate alternative queries from the original question using Ollama.
+    """
+    prompt = (
+        f"You are an AI language model assistant. Your task is to generate {num_queries} different "
+        f"versions of the given user question to retrieve relevant documents from a vector database. "
+        f"By generating multiple perspectives on the user question, your goal is to help the user overcome "
+        f"some of the limitations of the distance-based similarity search. Provide these alternative questions "
+        f"separated by newlines.\nOriginal question: {question}"
+    )
+    response = query_with_ollama(prompt, model)
+    alternative_queries = [q.strip() for q in response.split("\n") if q.strip()]
+    return alternative_queries
+
+def reciprocal_rank_fusion(results, k=60):
+    """
+    Perform Reciprocal Rank Fusion (RRF) on lists of retrieved documents.
+    Each element in 'results' is a list of documents (strings) retrieved for an alternative query.
+    """
+    fused_scores = {}
+    for docs in results:
+        for rank, doc in enumerate(docs):
+            if doc not in fused_scores:
+                fused_scores[doc] = 0
+            fused_scores[doc] += 1 / (rank + k)
+    # Sort documents by fused score in descending order
+    fused_results = sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
+    return fused_results
+
+def multiquery_rag_fusion(query, model, num_alternatives=5, n_results=3, k=60, filters=None):
+    """
+    Generate alternative queries, retrieve documents for each, and apply RRF to fuse results.
+    Only documents matching 'filters' (see corpus.py) are searched.
+    Returns a list of tuples (document, fused_score).
+    """
+    alternative_queries = generate_alternative_queries(query, model, num_alternatives)
+    logging.info(f"Alternative queries: {alternative_queries}")
+    all_results = []
+    for alt_query in alternative_queries:
+        docs = query_documents_from_mongodb(alt_query, n_results, filters)
+        all_results.append(docs)
+    logging.info(f"Retrieved documents for alternative queries: {all_results}")
+    fused_results = reciprocal_rank_fusion(all_results, k)
+    return fused_results
+
+def final_rag_fusion_answer(query, model, num_alternatives=5, n_results=3, k=60, filters=None):
+    """
+    Get final answer using RAG Fusion: fuse retrieved documents and generate an answer with context.
+    """
+    fused_results = multiquery_rag_fusion(query, model, num_alternatives, n_results, k, filters)
+    if fused_results:
+        # Use top 3 fused documents as context (adjust as needed)
+        top_docs = [doc for doc, score in fused_results[:3]]
+        context = " ".join(top_docs)
+    else:
+        context = "No relevant documents found."
+    augmented_prompt = f"Context: {context}\n\nQuestion: {query}\nAnswer:"
+    answer = query_with_ollama(augmented_prompt, model)
+    return answer
@@ -0,0 +1,165 @@
+"""
+Optional ONNX Runtime int8 inference for the sentence-embedding models.
+
+``OnnxSentenceEncoder`` exports a SentenceTransformer model to ONNX once,
+applies dynamic int8 weight quantization, caches both files under
+``ONNX_CACHE_PATH`` and then serves ``encode`` with ONNX Runtime on the CPU
+with a fixed number of intra-op threads. Its ``encode`` accepts the same
+arguments the repo uses from ``SentenceTransformer.encode`` and returns the same
+float32 numpy array, so it can be swapped in wherever the model is loaded.
+
+onnxruntime (and onnx for the export) are only imported when this path is
+used. Select it with EMBEDDING_INFERENCE=onnx-int8 (or onnx for float32 ONNX) and set
+the thread count with EMBEDDING_THREADS. ``benchmarks/bench_onnx_embeddings.py``
+compares accuracy and throughput with the PyTorch float32 path.
+"""
+import json
+import os
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
+
+ONNX_CACHE_PATH = os.path.join(os.getcwd(), "onnx_models")
+EMBEDDING_INFERENCE = os.environ.get("EMBEDDING_INFERENCE", "torch")
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0"))  # 0 lets ONNX Runtime decide
+INFERENCE_MODES = ("torch", "onnx", "onnx-int8")
+ONNX_OPSET = 14
+
+
+class _TransformerWithPooling(torch.nn.Module):
+    """Transformer plus mean pooling, so the exported graph returns sentence embeddings."""
+
+    def __init__(self, transformer):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if token_type_ids is not None:
+            inputs["token_type_ids"] = token_type_ids
+        token_embeddings = self.transformer(**inputs)[0]
+        mask = attention_mask.unsqueeze(-1).to(token_embeddings.dtype)
+        return (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+
+
+def _is_mean_pooling(pooling):
+    # sentence-transformers < 5 stores one boolean per mode, later versions a single "pooling_mode".
+    config = pooling.get_config_dict()
+    return config.get("pooling_mode") == "mean" or config.get("pooling_mode_mean_tokens", False)
+
+
+def export_onnx(model_name, target_dir):
+    """Export ``model_name`` (mean-pooling SentenceTransformer) to ``target_dir``."""
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer_module = model[0]
+    modules = [type(module).__name__ for module in model]
+    if modules[1:] not in (["Pooling"], ["Pooling", "Normalize"]) or not _is_mean_pooling(model[1]):
+        raise ValueError(f"Only Transformer + mean Pooling (+ Normalize) models can be exported, got {modules}")
+
+    tokenizer = transformer_module.tokenizer
+    os.makedirs(target_dir, exist_ok=True)
+    tokenizer.save_pretrained(target_dir)
+
+    sample = tokenizer(["An example sentence", "Another one"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    wrapper = _TransformerWithPooling(transformer_module.auto_model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(sample[name] for name in input_names),
+            os.path.join(target_dir, "model.onnx"),
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names},
+                          "sentence_embedding": {0: "batch"}},
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+
+    with open(os.path.join(target_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": model.max_seq_length,
+            "normalize": any(type(module).__name__ == "Normalize" for module in model),
+            "dimension": model.get_sentence_embedding_dimension(),
+        }, f)
+
+
+def quantize_onnx(target_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        os.path.join(target_dir, "model.onnx"),
+        os.path.join(target_dir, "model.int8.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+
+
+class OnnxSentenceEncoder:
+    def __init__(self, model_name, quantize=True, threads=EMBEDDING_THREADS, cache_path=ONNX_CACHE_PATH):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("EMBEDDING_INFERENCE=onnx/onnx-int8 needs onnxruntime: pip install onnxruntime onnx") from e
+
+        self.model_dir = os.path.join(cache_path, model_name.replace("/", "__"))
+        model_file = os.path.join(self.model_dir, "model.int8.onnx" if quantize else "model.onnx")
+        if not os.path.exists(os.path.join(self.model_dir, "model.onnx")):
+            export_onnx(model_name, self.model_dir)
+        if not os.path.exists(model_file):
+            quantize_onnx(self.model_dir)
+
+        with open(os.path.join(self.model_dir, "config.json"), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.max_seq_length = self.config["max_seq_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dimension"]
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, convert_to_numpy=True, **kwargs):
+        """Same contract as ``SentenceTransformer.encode`` for the arguments the repo uses."""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Sort by length so each batch pads as little as possible, like SentenceTransformer does.
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        embeddings = np.empty((len(sentences), self.config["dimension"]), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch = order[start:start + batch_size]
+            features = self.tokenizer(
+                [sentences[i] for i in batch], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np"
+            )
+            inputs = {name: features[name].astype(np.int64) for name in self.input_names}
+            embeddings[batch] = self.session.run(None, inputs)[0]
+
+        if normalize_embeddings or self.config["normalize"]:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+        if not convert_to_numpy:
+            embeddings = torch.from_numpy(embeddings)
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(model_name, inference=None):
+    """
+    The sentence encoder for ``model_name`` using the selected inference mode:
+    "torch" (SentenceTransformer, float32), "onnx" or "onnx-int8".
+    """
+    inference = inference or EMBEDDING_INFERENCE
+    if inference not in INFERENCE_MODES:
+        raise ValueError(f"Unknown inference mode '{inference}', expected one of {INFERENCE_MODES}")
+    if inference == "torch":
+        return SentenceTransformer(model_name)
+    return OnnxSentenceEncoder(model_name, quantize=inference == "onnx-int8")
@@ -0,0 +1,355 @@
+"""
+Portable index snapshots: one versioned file with the chunk ids, texts,
+metadata and embeddings of a ChromaDB collection or the MongoDB store.
+
+A new node can import a snapshot instead of re-parsing and re-embedding the
+source documents:
+    python snapshot.py export chroma --collection rag_collection_minilm -o constitution.ragsnap [--quantize]
+    python snapshot.py export mongo -o constitution.ragsnap
+    python snapshot.py info constitution.ragsnap [--verify]
+    python snapshot.py import constitution.ragsnap chroma [--collection NAME]
+    python snapshot.py import constitution.ragsnap mongo
+
+File layout (little endian): the 8-byte magic, uint32 format version and
+uint32 header length, then the JSON header, then the sections, each aligned to
+64 bytes. The header records the record count, embedding dimension and dtype,
+the model and distance metric, a SHA-256 of the sections and the offset and
+size of every section:
+    embeddings                  float32 (count, dim), or int8 with
+    scales                      one float32 scale per row (--quantize)
+    ids, texts, metadata        UTF-8 strings (metadata as JSON) stored back to
+    *_offsets                   back, with count + 1 uint64 offsets each
+
+``Snapshot`` memory-maps the file, so the embeddings are numpy views of the
+file and strings are decoded only when read.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"RAGSNAP\0"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 64
+BATCH_SIZE = 1000
+HASH_BLOCK_SIZE = 1 << 20
+STRING_SECTIONS = ("ids", "texts", "metadata")
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.environ.get("MONGO_DB", "rag_db")
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _pack_strings(values):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets.tobytes()
+
+
+def quantize_int8(embeddings):
+    """Symmetric per-row int8 quantization: row ~= int8 row * scale."""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def write_snapshot(path, ids, texts, metadatas, embeddings, quantize=False, **info):
+    """Write a snapshot file; ``info`` (model, space, source, ...) goes into the header."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if not len(ids) == len(texts) == len(metadatas) == len(embeddings):
+        raise ValueError("ids, texts, metadatas and embeddings must have the same length")
+
+    sections = {}
+    if quantize:
+        quantized, scales = quantize_int8(embeddings)
+        sections["embeddings"], sections["scales"] = quantized.tobytes(), scales.tobytes()
+    else:
+        sections["embeddings"] = embeddings.tobytes()
+    for name, values in zip(STRING_SECTIONS, (ids, texts, [json.dumps(m or {}) for m in metadatas])):
+        sections[name], sections[f"{name}_offsets"] = _pack_strings(values)
+
+    layout, position = {}, 0
+    for name, data in sections.items():
+        layout[name] = {"offset": position, "nbytes": len(data)}
+        position = _align(position + len(data))
+
+    header = {
+        "count": len(ids),
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "dtype": "int8" if quantize else "float32",
+        "created": time.time(),
+        **info,
+        "sections": layout,
+    }
+    # The checksum covers the sections exactly as laid out on disk, padding included.
+    body = bytearray(position)
+    for name, data in sections.items():
+        body[layout[name]["offset"]:layout[name]["offset"] + len(data)] = data
+    header["sha256"] = hashlib.sha256(body).hexdigest()
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    preamble = PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)) + header_bytes
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(preamble)
+        f.write(b"\0" * (_align(len(preamble)) - len(preamble)))
+        f.write(body)
+    os.replace(tmp_path, path)
+    return header
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an index snapshot")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {version}, this code reads up to {FORMAT_VERSION}")
+        self.version = version
+        self.header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_length])
+        self._data_start = _align(PREAMBLE.size + header_length)
+
+        count, dim = self.header["count"], self.header["dim"]
+        self.embeddings = self._array("embeddings", self.header["dtype"]).reshape(count, dim)
+        self.scales = self._array("scales", np.float32) if "scales" in self.header["sections"] else None
+        self._offsets = {name: self._array(f"{name}_offsets", np.uint64) for name in STRING_SECTIONS}
+
+    def _array(self, name, dtype):
+        section = self.header["sections"][name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=section["nbytes"] // dtype.itemsize,
+                             offset=self._data_start + section["offset"])
+
+    def _strings(self, name, start, end):
+        offsets = self._offsets[name]
+        base = self._data_start + self.header["sections"][name]["offset"]
+        return [
+            self._mmap[base + int(offsets[i]):base + int(offsets[i + 1])].decode("utf-8")
+            for i in range(start, end)
+        ]
+
+    def __len__(self):
+        return self.header["count"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.embeddings = self.scales = self._offsets = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # numpy views handed out are still alive; the map is released with them
+
+    def vectors(self, start=0, end=None):
+        """float32 embeddings of records [start, end), dequantized if the snapshot is int8."""
+        rows = self.embeddings[start:end]
+        if self.scales is None:
+            return rows
+        return rows.astype(np.float32) * self.scales[start:end, None]
+
+    def records(self, start=0, end=None):
+        end = len(self) if end is None else min(end, len(self))
+        return {
+            "ids": self._strings("ids", start, end),
+            "documents": self._strings("texts", start, end),
+            "metadatas": [json.loads(m) or None for m in self._strings("metadata", start, end)],
+            "embeddings": self.vectors(start, end),
+        }
+
+    def iter_batches(self, batch_size=BATCH_SIZE):
+        for start in range(0, len(self), batch_size):
+            yield self.records(start, start + batch_size)
+
+    def verify(self):
+        body_end = self._data_start + max(
+            (_align(s["offset"] + s["nbytes"]) for s in self.header["sections"].values()), default=0
+        )
+        # Hash straight from the map in blocks; slicing the mmap itself would copy the whole body.
+        checksum = hashlib.sha256()
+        with memoryview(self._mmap) as view:
+            for start in range(self._data_start, body_end, HASH_BLOCK_SIZE):
+                with view[start:min(start + HASH_BLOCK_SIZE, body_end)] as block:
+                    checksum.update(block)
+        return checksum.hexdigest() == self.header["sha256"]
+
+
+def mongo_collection(uri=MONGO_URI, db=MONGO_DB):
+    from pymongo import MongoClient
+
+    return MongoClient(uri)[db]["documents"]
+
+
+def export_chroma(path, collection_name, chroma_path, quantize=False):
+    import chromadb
+
+    from chroma_maintenance import read_all
+    from embeddings import BACKENDS
+
+    collection = chromadb.PersistentClient(path=chroma_path).get_collection(collection_name)
+    records = read_all(collection)
+    backend = next((name for name, b in BACKENDS.items() if b["collection"] == collection_name), None)
+    return write_snapshot(
+        path, records["ids"], records["documents"], records["metadatas"],
+        np.array(records["embeddings"], dtype=np.float32), quantize,
+        source="chroma", collection=collection_name, backend=backend,
+        model=BACKENDS[backend]["model"] if backend else None,
+        space=(collection.metadata or {}).get("hnsw:space", "l2"),
+    )
+
+
+def export_mongo(path, collection, quantize=False):
+    from embeddings import BACKENDS
+
+    ids, texts, metadatas, vectors = [], [], [], []
+    for record in collection.find({}, {"document": 1, "metadata": 1, "embedding": 1}):
+        ids.append(str(record["_id"]))
+        texts.append(record["document"])
+        metadatas.append(record.get("metadata"))
+        vectors.append(record["embedding"])
+    return write_snapshot(
+        path, ids, texts, metadatas, np.array(vectors, dtype=np.float32), quantize,
+        source="mongo", collection=collection.name, backend="sentence-transformers",
+        model=BACKENDS["sentence-transformers"]["model"], space="cosine",
+    )
+
+
+def import_chroma(snapshot, collection_name, chroma_path):
+    """Bulk-add the snapshot with its stored embeddings; ids already present are skipped."""
+    import chromadb
+
+    from chroma_store import get_or_create_collection
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    collection = get_or_create_collection(client, collection_name, space=snapshot.header.get("space"))
+    added = 0
+    for batch in snapshot.iter_batches():
+        existing = set(collection.get(ids=batch["ids"], include=[])["ids"])
+        keep = [i for i, doc_id in enumerate(batch["ids"]) if doc_id not in existing]
+        if not keep:
+            continue
+        metadatas = [
+            {key: value for key, value in (batch["metadatas"][i] or {}).items() if value is not None} or None
+            for i in keep
+        ]
+        collection.add(
+            ids=[batch["ids"][i] for i in keep],
+            documents=[batch["documents"][i] for i in keep],
+            embeddings=batch["embeddings"][keep].tolist(),
+            metadatas=metadatas
+        )
+        added += len(keep)
+    return added
+
+
+def import_mongo(snapshot, collection):
+    """Bulk-insert the snapshot in MongoDB's record layout; ids already present are skipped."""
+    added = 0
+    for batch in snapshot.iter_batches():
+        existing = {record["_id"] for record in collection.find({"_id": {"$in": batch["ids"]}}, {"_id": 1})}
+        documents = [
+            {
+                "_id": doc_id,
+                "parent_id": doc_id.rsplit("_chunk_", 1)[0],
+                "document": text,
+                "metadata": metadata or {},
+                "embedding": vector.tolist(),
+            }
+            for doc_id, text, metadata, vector in zip(
+                batch["ids"], batch["documents"], batch["metadatas"], batch["embeddings"]
+            )
+            if doc_id not in existing
+        ]
+        if documents:
+            collection.insert_many(documents, ordered=False)
+            added += len(documents)
+    return added
+
+
+def main():
+    from chroma_store import CHROMA_PATH
+
+    parser = argparse.ArgumentParser(description="Export and import index snapshots")
+    parser.add_argument("--path", default=CHROMA_PATH, help="persistent ChromaDB directory")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--mongo-db", default=MONGO_DB)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("store", choices=["chroma", "mongo"])
+    export_parser.add_argument("-o", "--output", required=True)
+    export_parser.add_argument("--collection", help="ChromaDB collection (default: the current backend's)")
+    export_parser.add_argument("--quantize", action="store_true", help="store int8 embeddings with row scales")
+
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("snapshot")
+    import_parser.add_argument("store", choices=["chroma", "mongo"])
+    import_parser.add_argument("--collection", help="ChromaDB collection (default: the one in the snapshot)")
+    import_parser.add_argument("--no-verify", action="store_true", help="skip the checksum check")
+
+    info_parser = subparsers.add_parser("info")
+    info_parser.add_argument("snapshot")
+    info_parser.add_argument("--verify", action="store_true")
+
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    if args.command == "export":
+        if args.store == "chroma":
+            from embeddings import collection_for_backend
+
+            header = export_chroma(args.output, args.collection or collection_for_backend(), args.path, args.quantize)
+        else:
+            header = export_mongo(args.output, mongo_collection(args.mongo_uri, args.mongo_db), args.quantize)
+        print(f"Exported {header['count']} records ({header['dim']}-dim {header['dtype']}) to {args.output} "
+              f"({os.path.getsize(args.output) / 1024 / 1024:.1f} MiB) in {time.perf_counter() - started:.1f} s")
+        return
+
+    with Snapshot(args.snapshot) as snapshot:
+        header = snapshot.header
+        if args.command == "info":
+            print(json.dumps({key: value for key, value in header.items() if key != "sections"}, indent=2))
+            if args.verify:
+                print("checksum ok" if snapshot.verify() else "CHECKSUM MISMATCH")
+            return
+
+        if not args.no_verify and not snapshot.verify():
+            raise SystemExit(f"{args.snapshot} is corrupt: checksum mismatch")
+        if args.store == "chroma":
+            target = args.collection or header["collection"]
+            if not args.collection and header["source"] != "chroma":
+                from embeddings import collection_for_backend
+
+                target = collection_for_backend(header["backend"])
+            added = import_chroma(snapshot, target, args.path)
+        else:
+            if header.get("backend") != "sentence-transformers":
+                print(f"Warning: the snapshot was embedded with {header.get('model')}, "
+                      "but the MongoDB app queries with the MiniLM sentence-transformers model")
+            target = f"{args.mongo_db}.documents"
+            added = import_mongo(snapshot, mongo_collection(args.mongo_uri, args.mongo_db))
+        print(f"Imported {added} of {len(snapshot)} records into {target} "
+              f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
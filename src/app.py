@@ -1,46 +1,38 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import sys
 import streamlit as st
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
+from langchain_ollama import OllamaLLM
 import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import fitz
 from io import BytesIO
 import tempfile
 
+# Shared modules (chunking, ...) live in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chroma_store import CHROMA_PATH, add_new_documents, get_or_create_collection, list_sources
+from embeddings import collection_for_backend, make_embedding_function
+from corpus import chroma_where, new_session_id, parse_articles
+from ingest_ui import get_ingest_queue, show_ingest_jobs, submit_sources
+from fetcher import get_fetcher
+
 # Constants
 LLM_MODEL = "llama3.2"
-BASE_URL = "http://localhost:11434"
-
-chroma_client = chromadb.PersistentClient(path=os.path.join(os.getcwd(), "chroma_db"))
+BASE_URL = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 
-class ChromaDBEmbeddingFunction:
-    def __init__(self, langchain_embeddings):
-        self.langchain_embeddings = langchain_embeddings
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 
-    def __call__(self, input):
-        if isinstance(input, str):
-            input = [input]
-        elif not isinstance(input, list):
-            raise ValueError("Input to the embedding function must be a string or a list of strings.")
-        return self.langchain_embeddings.embed_documents(input)
+embedding = make_embedding_function()
 
-embedding = ChromaDBEmbeddingFunction(
-    langchain_embeddings=OllamaEmbeddings(model=LLM_MODEL, base_url=BASE_URL)
-)
+collection_name = collection_for_backend()
+collection = get_or_create_collection(chroma_client, collection_name, embedding)
 
-collection_name = "rag_collection_demo"
-collection = chroma_client.get_or_create_collection(
-    name=collection_name,
-    metadata={"description": "RAG collection for documents"},
-    embedding_function=embedding
-)
-
-def add_documents_to_collection(documents, ids):
+def add_documents_to_collection(documents, ids, metadatas=None):
     if not documents or not ids:
         raise ValueError("Documents or IDs are empty, cannot add to collection")
-    collection.add(documents=documents, ids=ids)
+    return add_new_documents(collection, documents, ids, metadatas)
+
+def delete_documents_from_collection(ids):
+    collection.delete(ids=ids)
 
 def read_pdf(file):
     with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
@@ -58,42 +50,28 @@ def read_pdf(file):
     return text
 
 def read_html(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    content = soup.find("div", class_="content")
-    return content.get_text() if content else ""
-
-def process_and_add_documents(content, file_name_prefix=""):
-    if not content:
-        print(f"Warning: Content from {file_name_prefix} is empty. Skipping processing.")
-        return
-
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = text_splitter.split_text(content)
-
-    if not chunks:
-        print(f"No chunks found in the content of {file_name_prefix}")
-    else:
-        print(f"Splitting content into {len(chunks)} chunks for {file_name_prefix}.")
-
-    chunk_ids = [f"{file_name_prefix}_chunk_{i}" for i in range(len(chunks))]
-
-    if not chunks or not chunk_ids:
-        print(f"Warning: No valid chunks or chunk IDs for {file_name_prefix}. Skipping add to collection.")
-        return
-
-    add_documents_to_collection(chunks, chunk_ids)
-
-def rag_pipeline(query_text):
-    retrieved_docs = query_chromadb(query_text)
+    # Pooled, cached fetch with timeouts and retries; only the content div is parsed (see fetcher.py).
+    return get_fetcher().fetch_text(url, "div", {"class": "content"})
+
+def read_source(kind, data):
+    """Runs on an ingestion worker thread: data is the file bytes, or the URL for kind "html"."""
+    if kind == "pdf":
+        return read_pdf(BytesIO(data))
+    if kind == "html":
+        return read_html(data.decode("utf-8"))
+    return data.decode("utf-8")
+
+def rag_pipeline(query_text, filters=None):
+    retrieved_docs = query_chromadb(query_text, where=chroma_where(filters))
     context = " ".join(doc for docs in retrieved_docs for doc in docs) if retrieved_docs else ""
     prompt = f"{context} {query_text}" if context else query_text
     return query_ollama(prompt)
 
-def query_chromadb(query_text, n_results=3):
+def query_chromadb(query_text, n_results=3, where=None):
     results = collection.query(
         query_texts=[query_text],
-        n_results=n_results
+        n_results=n_results,
+        where=where
     )
     return results["documents"]
 
@@ -103,6 +81,13 @@ def query_ollama(prompt):
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "upload_session" not in st.session_state:
+    st.session_state.upload_session = new_session_id()
+if "sources" not in st.session_state:
+    st.session_state.sources = list_sources(collection)
+
+def refresh_sources():
+    st.session_state.sources = list_sources(collection)
 
 def main():
     st.title("Interactive AI Assistant for the Constitution of Kazakhstan")
@@ -113,24 +98,23 @@ def main():
     uploaded_files = st.sidebar.file_uploader(
         "Upload .txt or .pdf files", type=["txt", "pdf"], accept_multiple_files=True
     )
-    url = st.sidebar.text_input("Enter URL to HTML version of Constitution")
+    corpus = st.sidebar.text_input("Corpus (optional namespace)").strip()
+    urls = st.sidebar.text_input("Enter URL(s) to HTML version of Constitution, separated by spaces").split()
 
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            file_extension = uploaded_file.name.split(".")[-1].lower()
-
-            if file_extension == "txt":
-                content = uploaded_file.read().decode("utf-8")
-            elif file_extension == "pdf":
-                content = read_pdf(uploaded_file)
+    ingest_queue = get_ingest_queue(read_source, add_documents_to_collection, delete_documents_from_collection)
 
-            process_and_add_documents(content, file_name_prefix=uploaded_file.name)
+    # Queue uploaded files and URLs for background ingestion
+    submit_sources(ingest_queue, uploaded_files or [], urls, st.session_state.upload_session, corpus)
+    if uploaded_files:
+        st.sidebar.success(f"Queued {len(uploaded_files)} file(s) for ingestion.")
 
-        st.sidebar.success(f"Uploaded and processed {len(uploaded_files)} file(s).")
+    with st.sidebar:
+        show_ingest_jobs(ingest_queue, refresh_sources)
 
-    if url:
-        content = read_html(url)
-        process_and_add_documents(content, file_name_prefix="html_version")
+    st.sidebar.header("Search Scope")
+    selected_sources = st.sidebar.multiselect("Search only these sources", st.session_state.sources)
+    articles = st.sidebar.text_input("Restrict to Articles (e.g. 1, 12, 3-1)")
+    filters = {"corpus": corpus, "source": selected_sources, "article": parse_articles(articles)}
 
     prompt = st.chat_input("Ask your question:")
 
@@ -145,7 +129,7 @@ def main():
         if st.session_state.messages[-1]["role"] != "assistant":
             with st.chat_message("assistant"):
                 with st.spinner("Assistant is typing..."):
-                    response_message = rag_pipeline(prompt)
+                    response_message = rag_pipeline(prompt, filters)
                     st.session_state.messages.append({"role": "assistant", "content": response_message})
                     st.write(response_message)
 
@@ -0,0 +1,53 @@
+import argparse
+import os
+import uuid
+
+import chromadb
+import pytest
+
+from chroma_maintenance import SQLITE_FILE, compact, segment_directories
+
+
+def compact_args(path, store_existed=True, dry_run=False):
+    return argparse.Namespace(path=str(path), store_existed=store_existed, dry_run=dry_run)
+
+
+def make_dirs(path, *names):
+    for name in names:
+        os.makedirs(os.path.join(path, name))
+
+
+def test_compact_refuses_a_directory_that_was_not_a_store(tmp_path):
+    make_dirs(tmp_path, ".git", "src", "test", str(uuid.uuid4()))
+    client = chromadb.PersistentClient(path=str(tmp_path))  # creates an empty chroma.sqlite3
+
+    with pytest.raises(SystemExit):
+        compact(client, compact_args(tmp_path, store_existed=False))
+    assert len(os.listdir(tmp_path)) == 5
+
+
+def test_compact_refuses_a_store_without_segments(tmp_path):
+    orphan = str(uuid.uuid4())
+    make_dirs(tmp_path, "src", orphan)
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    assert os.path.exists(tmp_path / SQLITE_FILE)
+
+    with pytest.raises(SystemExit):
+        compact(client, compact_args(tmp_path))
+    assert os.path.isdir(tmp_path / orphan)
+
+
+def test_compact_removes_only_orphaned_segment_folders(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("docs", embedding_function=None)
+    collection.add(ids=["a", "b"], documents=["one", "two"], embeddings=[[1.0, 0.0], [0.0, 1.0]])
+    orphan = str(uuid.uuid4())
+    make_dirs(tmp_path, orphan, "src", ".git")
+
+    assert orphan in segment_directories(str(tmp_path))
+    assert "src" not in segment_directories(str(tmp_path))
+    compact(client, compact_args(tmp_path))
+
+    assert not os.path.exists(tmp_path / orphan)
+    assert os.path.isdir(tmp_path / "src") and os.path.isdir(tmp_path / ".git")
+    assert collection.count() == 2
@@ -0,0 +1,129 @@
+from ingest_jobs import IngestJobQueue
+
+TEXT = "\n".join(f"Article {i}\nParagraph {i} of the test document." for i in range(1, 11))
+
+
+class Store:
+    def __init__(self, fail_after=None):
+        self.ids = []
+        self.fail_after = fail_after
+
+    def add_batch(self, texts, ids, metadatas):
+        if self.fail_after is not None and len(self.ids) >= self.fail_after:
+            raise RuntimeError("store is down")
+        new = [i for i in ids if i not in self.ids]
+        self.ids.extend(new)
+        return new
+
+    def delete_ids(self, ids):
+        self.ids = [i for i in self.ids if i not in ids]
+
+
+def make_queue(path, store, parse=None, workers=1):
+    return IngestJobQueue(
+        parse or (lambda kind, data: data.decode("utf-8")), store.add_batch, store.delete_ids,
+        path=str(path), workers=workers, batch_size=4,
+    )
+
+
+def statuses(jobs):
+    return [job["status"] for job in jobs.list_jobs()]
+
+
+def test_job_runs_to_done_and_resubmitting_returns_the_same_job(tmp_path):
+    store = Store()
+    jobs = make_queue(tmp_path, store)
+    job_id = jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt")
+    jobs._queue.join()
+
+    assert statuses(jobs) == ["done"]
+    assert jobs.list_jobs()[0]["added"] == len(store.ids) == 10
+    assert jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt") == job_id
+    assert len(jobs.list_jobs()) == 1
+
+
+def test_cancel_a_job_that_failed_before_any_batch(tmp_path):
+    def parse(kind, data):
+        raise ValueError("cannot fetch")
+
+    jobs = make_queue(tmp_path, Store(), parse=parse)
+    jobs.submit("https://example.com", b"https://example.com", "html")
+    jobs._queue.join()
+    assert statuses(jobs) == ["failed"]
+
+    jobs.cancel(jobs.list_jobs()[0]["id"])
+    assert statuses(jobs) == ["cancelled"]
+    jobs.clear_finished()
+    assert statuses(jobs) == []
+
+
+def test_cancel_a_job_that_failed_midway_deletes_its_chunks(tmp_path):
+    store = Store(fail_after=4)
+    jobs = make_queue(tmp_path, store)
+    job_id = jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt")
+    jobs._queue.join()
+    assert statuses(jobs) == ["failed"]
+    assert len(store.ids) == 4
+
+    jobs.cancel(job_id)
+    jobs._queue.join()
+    assert statuses(jobs) == ["cancelled"]
+    assert store.ids == []
+
+    store.fail_after = None
+    jobs.retry(job_id)
+    jobs._queue.join()
+    assert statuses(jobs) == ["done"]
+    assert len(store.ids) == 10
+
+
+def test_cancel_keeps_chunks_added_by_an_earlier_job(tmp_path):
+    store = Store()
+    jobs = make_queue(tmp_path, store)
+    jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt")
+    jobs._queue.join()
+    first_ids = list(store.ids)
+
+    # The changed file has the same chunk ids for its first 10 chunks.
+    store.fail_after = 12
+    changed = TEXT + "".join(f"\nArticle {i}\nParagraph {i} of the test document." for i in range(11, 16))
+    job_id = jobs.submit("doc.txt", changed.encode("utf-8"), "txt")
+    jobs._queue.join()
+    assert len(store.ids) == 12
+
+    jobs.cancel(job_id)
+    jobs._queue.join()
+    assert store.ids == first_ids
+
+
+def test_cancel_and_retry_a_queued_job(tmp_path):
+    jobs = make_queue(tmp_path, Store(), workers=0)
+    job_id = jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt")
+    assert statuses(jobs) == ["queued"]
+
+    jobs.cancel(job_id)
+    assert statuses(jobs) == ["cancelled"]
+    jobs.retry(job_id)
+    assert statuses(jobs) == ["queued"]
+
+
+def test_cleared_job_can_be_submitted_again(tmp_path):
+    store = Store()
+    jobs = make_queue(tmp_path, store, workers=0)
+    job_id = jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt")
+    jobs.cancel(job_id)
+    jobs.clear_finished()
+    assert statuses(jobs) == []
+
+    assert jobs.submit("doc.txt", TEXT.encode("utf-8"), "txt") == job_id
+    assert statuses(jobs) == ["queued"]
+
+
+def test_queued_job_resumes_after_restart(tmp_path):
+    store = Store()
+    make_queue(tmp_path, store, workers=0).submit("doc.txt", TEXT.encode("utf-8"), "txt")
+
+    jobs = make_queue(tmp_path, store)
+    jobs._queue.join()
+    assert statuses(jobs) == ["done"]
+    assert len(store.ids) == 10
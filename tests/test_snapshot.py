@@ -0,0 +1,48 @@
+import chromadb
+import numpy as np
+
+from snapshot import Snapshot, export_chroma, import_chroma, write_snapshot
+
+COLLECTION = "rag_collection_demo"
+IDS = ["doc.txt_chunk_0", "doc.txt_chunk_1", "doc.txt_chunk_2"]
+TEXTS = ["Article 1\nFirst.", "Article 2\nSecond.", "Article 3\nThird."]
+METADATAS = [{"source": "doc.txt", "article": "1"}, None, {"source": "doc.txt", "article": "3"}]
+EMBEDDINGS = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+
+
+def test_chroma_export_verify_import_round_trip(tmp_path):
+    source = chromadb.PersistentClient(path=str(tmp_path / "source"))
+    source.create_collection(COLLECTION, embedding_function=None).add(
+        ids=IDS, documents=TEXTS, metadatas=METADATAS, embeddings=EMBEDDINGS
+    )
+    path = str(tmp_path / "index.ragsnap")
+    export_chroma(path, COLLECTION, str(tmp_path / "source"))
+
+    with Snapshot(path) as snapshot:
+        assert snapshot.verify()
+        assert import_chroma(snapshot, COLLECTION, str(tmp_path / "target")) == 3
+        # A second import finds every id already present.
+        assert import_chroma(snapshot, COLLECTION, str(tmp_path / "target")) == 0
+
+    target = chromadb.PersistentClient(path=str(tmp_path / "target")).get_collection(COLLECTION)
+    records = target.get(ids=IDS, include=["documents", "metadatas", "embeddings"])
+    assert records["ids"] == IDS
+    assert records["documents"] == TEXTS
+    assert records["metadatas"] == METADATAS
+    np.testing.assert_allclose(records["embeddings"], EMBEDDINGS)
+
+
+def test_verify_detects_a_corrupted_body(tmp_path):
+    path = str(tmp_path / "index.ragsnap")
+    write_snapshot(path, IDS, TEXTS, METADATAS, np.array(EMBEDDINGS), quantize=True)
+    with Snapshot(path) as snapshot:
+        assert snapshot.verify()
+        assert snapshot.records()["metadatas"] == METADATAS
+
+    with open(path, "r+b") as f:
+        f.seek(-1, 2)
+        last = f.read(1)
+        f.seek(-1, 2)
+        f.write(bytes([last[0] ^ 0xFF]))
+    with Snapshot(path) as snapshot:
+        assert not snapshot.verify()